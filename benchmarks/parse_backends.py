@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# Compare the CSV parse backends in datahub.parsing by worker count.
+#
+#   python benchmarks/parse_backends.py --megabytes 512
+#   python benchmarks/parse_backends.py --file upload.csv --workers 1 2 4 8 16
+#
+# Prints the best of --repeat runs for every backend and worker count, and
+# the speedup over a single-threaded pd.read_csv() of the same bytes.
+import argparse
+import io
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datahub.parsing import parse_csv, resolve_backend  # noqa: E402
+
+
+def synthetic_csv(megabytes, seed=0):
+    # A mix of the column types the dashboards see: ids, measurements,
+    # categories and free text (some of it quoted)
+    rng = np.random.default_rng(seed)
+    rows = max(1000, int(megabytes * 1024 ** 2 / 34))
+    frame = pd.DataFrame({
+        "id": np.arange(rows),
+        "value": rng.normal(50, 20, rows).round(4),
+        "score": rng.integers(0, 100, rows),
+        "category": rng.choice(["alpha", "beta", "gamma", "delta"], rows),
+        "comment": rng.choice(["ok", "needs review", "late, resubmitted", ""], rows),
+    })
+    return frame.to_csv(index=False).encode()
+
+
+def best_time(function, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the CSV parse backends by worker count.")
+    parser.add_argument("--file", help="CSV file to parse (default: synthetic data)")
+    parser.add_argument("--megabytes", type=float, default=256, help="size of the synthetic CSV")
+    parser.add_argument("--workers", type=int, nargs="+", help="worker counts to try (default: powers of two up to the core count)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.file:
+        with open(args.file, "rb") as handle:
+            raw = handle.read()
+    else:
+        raw = synthetic_csv(args.megabytes)
+    cores = os.cpu_count() or 1
+    workers = args.workers or sorted({2 ** power for power in range(cores.bit_length())} | {cores})
+
+    baseline = best_time(lambda: pd.read_csv(io.BytesIO(raw)), args.repeat)
+    print(f"{len(raw) / 1024 ** 2:,.0f} MB, {cores} cores; pd.read_csv: {baseline:.2f} s")
+    print(f"{'backend':<8} {'workers':>7} {'seconds':>8} {'MB/s':>8} {'speedup':>8}")
+    for backend in ("arrow", "blocks"):
+        if resolve_backend({}, backend) != backend:
+            print(f"{backend:<8} unavailable")
+            continue
+        for count in workers:
+            seconds = best_time(lambda: parse_csv(raw, backend=backend, workers=count), args.repeat)
+            rate = len(raw) / 1024 ** 2 / seconds
+            print(f"{backend:<8} {count:>7} {seconds:>8.2f} {rate:>8.0f} {baseline / seconds:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
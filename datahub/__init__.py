@@ -0,0 +1,61 @@
+# Shared data layer for the Streamlit dashboards in this repository.
+#
+# Every app used to call pd.read_csv(uploaded_file) directly and redo all of
+# its work on each rerun.  The helpers here keep parsed uploads (and anything
+# derived from them) in process-wide caches so that only the first
+# interaction with a dataset pays for it.
+from datahub.cache import LRUByteCache
+from datahub.dataset import Dataset
+from datahub.dtypes import optimize_dtypes
+from datahub.formats import upload_types
+from datahub.index import SortedColumnIndex, filter_greater, sorted_index
+from datahub.ingest import dataset_cache, load_dataset, load_lazy_dataset, upload_key
+from datahub.lazy import LazyDataset
+from datahub.metrics import selection_metrics, threshold_metrics
+from datahub.outofcore import ChunkedDataset
+from datahub.predicates import And, In, Or, Range, evaluate, select_greater
+from datahub.pyramid import LevelPyramid
+from datahub.queries import cache_statistics, cached_query, query_cache
+from datahub.sampling import SampleDataset, estimate_greater, sample_dataset
+from datahub.sketches import KLLSketch
+from datahub.stats import Moments, RunningStats
+from datahub.summary import describe_all, describe_greater, describe_rows
+from datahub.views import RowView
+
+__all__ = [
+    "And",
+    "ChunkedDataset",
+    "Dataset",
+    "In",
+    "KLLSketch",
+    "LRUByteCache",
+    "LazyDataset",
+    "LevelPyramid",
+    "Moments",
+    "Or",
+    "Range",
+    "RowView",
+    "RunningStats",
+    "SampleDataset",
+    "SortedColumnIndex",
+    "cache_statistics",
+    "cached_query",
+    "dataset_cache",
+    "describe_all",
+    "describe_greater",
+    "describe_rows",
+    "estimate_greater",
+    "evaluate",
+    "filter_greater",
+    "load_dataset",
+    "load_lazy_dataset",
+    "optimize_dtypes",
+    "query_cache",
+    "sample_dataset",
+    "select_greater",
+    "selection_metrics",
+    "sorted_index",
+    "threshold_metrics",
+    "upload_key",
+    "upload_types",
+]
@@ -0,0 +1,71 @@
+# Tunables for the shared data layer, read once from the environment.
+import os
+
+_UNITS = {"k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}
+
+
+def env_bytes(name, default):
+    # Accepts plain byte counts as well as "512M" / "2G" style values
+    value = os.environ.get(name, "").strip().lower().rstrip("b")
+    if not value:
+        return default
+    if value[-1] in _UNITS:
+        return int(float(value[:-1]) * _UNITS[value[-1]])
+    return int(value)
+
+
+# Total size of parsed datasets kept in memory across all sessions
+DATASET_CACHE_BYTES = env_bytes("DATAHUB_DATASET_CACHE_BYTES", 2 * 1024 ** 3)
+
+# Target size of one parsed block when uploads are streamed in chunks
+CHUNK_BYTES = env_bytes("DATAHUB_CHUNK_BYTES", 16 * 1024 ** 2)
+
+# On-disk Arrow spill of parsed uploads; an empty directory disables it
+SPILL_DIR = os.environ.get("DATAHUB_SPILL_DIR", os.path.join(os.path.expanduser("~"), ".cache", "datahub"))
+SPILL_BYTES = env_bytes("DATAHUB_SPILL_BYTES", 20 * 1024 ** 3)
+
+# Downcast numerics and categorise repetitive text columns at ingest
+OPTIMIZE_DTYPES = os.environ.get("DATAHUB_OPTIMIZE_DTYPES", "1") not in ("0", "false", "no")
+
+# Worker threads for background jobs (exports, precomputation, ...)
+JOB_WORKERS = int(os.environ.get("DATAHUB_JOB_WORKERS", min(8, os.cpu_count() or 1)))
+
+# Results of finished jobs (export files, ...) kept for the sessions that
+# asked for them; the least recently used are forgotten beyond this
+JOB_RESULT_BYTES = env_bytes("DATAHUB_JOB_RESULT_BYTES", 512 * 1024 ** 2)
+
+# Default number of points handed to a chart; roughly two per pixel of a
+# full-width chart
+CHART_POINTS = int(os.environ.get("DATAHUB_CHART_POINTS", 2000))
+
+# Rendered matplotlib charts (PNG bytes) kept across reruns and sessions
+IMAGE_CACHE_BYTES = env_bytes("DATAHUB_IMAGE_CACHE_BYTES", 64 * 1024 ** 2)
+
+# Scatter plots with more points than this are drawn as a density grid
+SCATTER_EXACT_POINTS = int(os.environ.get("DATAHUB_SCATTER_EXACT_POINTS", 50_000))
+
+# Rows sent to the browser per page of a table
+TABLE_PAGE_ROWS = int(os.environ.get("DATAHUB_TABLE_PAGE_ROWS", 100))
+
+# Filter results and aggregates shared by every session, keyed by dataset
+# content and normalised query
+QUERY_CACHE_BYTES = env_bytes("DATAHUB_QUERY_CACHE_BYTES", 256 * 1024 ** 2)
+
+# CSV parser used at ingest: "auto", "arrow", "blocks" or "pandas" (see
+# datahub.parsing)
+PARSE_BACKEND = os.environ.get("DATAHUB_PARSE_BACKEND", "auto").strip().lower()
+
+# Threads one upload is parsed with
+PARSE_WORKERS = int(os.environ.get("DATAHUB_PARSE_WORKERS", os.cpu_count() or 1))
+
+# Uploads larger than this (after decompression) are streamed to an Arrow
+# file and processed chunk by chunk instead of being read into memory
+OUT_OF_CORE_BYTES = env_bytes("DATAHUB_OUT_OF_CORE_BYTES", DATASET_CACHE_BYTES // 4)
+
+# Rows kept in every dataset's reservoir sample for fast previews
+PREVIEW_SAMPLE_ROWS = int(os.environ.get("DATAHUB_PREVIEW_SAMPLE_ROWS", 100_000))
+
+# Widest pyramid level kept for an out-of-core column, 28 bytes a bucket
+# (about 3.5 MB per column over all levels); finer views read their window
+# from disk
+PYRAMID_BUCKETS = int(os.environ.get("DATAHUB_PYRAMID_BUCKETS", 1 << 16))
@@ -0,0 +1,75 @@
+# A parsed upload together with the structures derived from it.
+import threading
+
+from datahub.index import is_indexable
+
+
+class Dataset:
+    # (cache, key) this dataset is kept under, so that derived structures
+    # are charged to that cache's byte budget as they are built
+    _cached = None
+
+    def __init__(self, key, frame):
+        self.key = key
+        self.frame = frame
+        self.nbytes = int(frame.memory_usage(deep=True).sum())
+        self._derived = {}
+        # Re-entrant: building one derived structure may need another
+        self._lock = threading.RLock()
+        # How the frame was produced (rows, chunks, seconds, ...), if known
+        self.ingest_report = {}
+
+    @property
+    def columns(self):
+        return self.frame.columns
+
+    def __len__(self):
+        return len(self.frame)
+
+    @property
+    def index(self):
+        return self.frame.index
+
+    def column(self, name):
+        return self.frame[name]
+
+    def take(self, positions):
+        # Every column of the rows at `positions`
+        return self.frame.take(positions)
+
+    def column_at(self, name, positions):
+        return self.column(name).take(positions)
+
+    def is_numeric(self, name):
+        # Whether the column can have sorted indexes, pyramids, ...
+        return is_indexable(self.column(name))
+
+    def cache_in(self, cache, key):
+        self._cached = (cache, key)
+        cache.put(key, self, self.nbytes)
+
+    def _grow(self, nbytes):
+        self.nbytes += nbytes
+        if self._cached is not None and nbytes:
+            cache, key = self._cached
+            # Re-put so the LRU sees the new size; an evicted dataset stays out
+            if key in cache:
+                cache.put(key, self, self.nbytes)
+
+    def derived(self, name, build):
+        # Build a per-dataset structure (index, statistics, ...) once and
+        # share it between every session looking at the same upload
+        with self._lock:
+            if name not in self._derived:
+                self._derived[name] = build()
+                self._grow(getattr(self._derived[name], "nbytes", 0))
+            return self._derived[name]
+
+    def has_derived(self, name):
+        return name in self._derived
+
+    def provide(self, name, value):
+        # Register a structure that was built elsewhere, e.g. during ingestion
+        with self._lock:
+            self._derived[name] = value
+            self._grow(getattr(value, "nbytes", 0))
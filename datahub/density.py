@@ -0,0 +1,67 @@
+# Aggregate-then-render scatter plots.
+#
+# ax.scatter() draws one marker per row, which takes tens of seconds past a
+# million points and produces a solid blob long before that.  Above
+# SCATTER_EXACT_POINTS the points are instead counted into a pixel-sized
+# grid with a single vectorised bincount and the grid is shown as an image
+# shaded by count, so rendering costs the same whatever the row count.
+# Smaller selections keep their exact markers.
+import numpy as np
+import pandas as pd
+
+from datahub.config import SCATTER_EXACT_POINTS
+from datahub.index import as_numpy, is_indexable
+
+try:
+    from matplotlib.colors import LinearSegmentedColormap, LogNorm, to_rgba
+except ImportError:  # matplotlib is optional; only the static charts need it
+    LinearSegmentedColormap = LogNorm = to_rgba = None
+
+GRID_WIDTH = 640
+GRID_HEIGHT = 480
+
+
+def density_grid(x, y, width=GRID_WIDTH, height=GRID_HEIGHT):
+    # Counts of (x, y) per grid cell, rows running bottom to top, and the
+    # (left, right, bottom, top) data extent the grid covers
+    keep = np.isfinite(x) & np.isfinite(y)
+    x, y = x[keep], y[keep]
+    if not len(x):
+        return np.zeros((height, width), dtype=np.int64), (0.0, 1.0, 0.0, 1.0)
+    left, right = float(x.min()), float(x.max())
+    bottom, top = float(y.min()), float(y.max())
+    column = _cells(x, left, right, width)
+    row = _cells(y, bottom, top, height)
+    counts = np.bincount(row * width + column, minlength=width * height)
+    return counts.reshape(height, width), (left, right, bottom, top)
+
+
+def _cells(values, low, high, cells):
+    if high <= low:
+        return np.zeros(len(values), dtype=np.int64)
+    scaled = (values - low) * (cells / (high - low))
+    return np.minimum(scaled.astype(np.int64), cells - 1)
+
+
+def density_scatter(ax, x, y, color, exact_points=SCATTER_EXACT_POINTS):
+    # Drop-in for ax.scatter(x, y, color=color) on large selections
+    if isinstance(y, pd.Series) and is_indexable(y):
+        y = as_numpy(y)
+    x, y = np.asarray(x), np.asarray(y)
+    numeric = np.issubdtype(x.dtype, np.number) and np.issubdtype(y.dtype, np.number)
+    if len(x) <= exact_points or not numeric:
+        return ax.scatter(x, y, color=color)
+    counts, extent = density_grid(x.astype("float64"), y.astype("float64"))
+    # Single points stay visible as a faint tint of the chosen color
+    shading = LinearSegmentedColormap.from_list("density", [to_rgba(color, 0.25), to_rgba(color, 1.0)])
+    image = ax.imshow(
+        np.ma.masked_equal(counts, 0),
+        origin="lower",
+        extent=extent,
+        aspect="auto",
+        interpolation="nearest",
+        cmap=shading,
+        norm=LogNorm(vmin=1, vmax=max(int(counts.max()), 1)),
+    )
+    ax.figure.colorbar(image, ax=ax, label="Points per cell")
+    return image
@@ -0,0 +1,104 @@
+# Chart data reduction.
+#
+# Browsers choke on charts with millions of points, and a chart a thousand
+# pixels wide cannot show more than a couple of thousand anyway.  Series
+# longer than the point budget are reduced before they are sent:
+#
+# * LTTB (Largest-Triangle-Three-Buckets) keeps, per bucket, the point that
+#   forms the largest triangle with its neighbours.  It preserves the visual
+#   shape of line and area charts.
+# * min/max keeps the lowest and highest point of every bucket, so bars and
+#   scatter plots never lose their extremes.
+#
+# Out-of-core datasets are reduced min/max per bucket while the column is
+# read batch by batch (minmax_batches), so the selected rows are never
+# gathered into one series.
+import numpy as np
+import pandas as pd
+
+
+def lttb_indices(x, y, n_out):
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+    # n_out - 2 buckets between the fixed first and last points
+    edges = (np.arange(n_out - 1) * (n - 2) / (n_out - 2)).astype(np.int64) + 1
+    edges[-1] = n - 1
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for bucket in range(n_out - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        if bucket + 2 < len(edges):
+            next_start, next_end = edges[bucket + 1], edges[bucket + 2]
+        else:
+            next_start, next_end = n - 1, n
+        next_x = x[next_start:next_end].mean()
+        next_y = y[next_start:next_end].mean()
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+    return selected
+
+
+def minmax_indices(y, n_out):
+    n = len(y)
+    if n_out >= n or n_out < 2:
+        return np.arange(n)
+    y = np.asarray(y, dtype="float64")
+    edges = np.linspace(0, n, n_out // 2 + 1).astype(np.int64)
+    picks = []
+    for start, end in zip(edges[:-1], edges[1:]):
+        if end > start:
+            block = y[start:end]
+            picks.append(start + int(np.argmin(block)))
+            picks.append(start + int(np.argmax(block)))
+    return np.unique(picks)
+
+
+def minmax_batches(batches, positions, n_out):
+    # min/max per bucket of the values at `positions` (sorted; a RangeIndex
+    # for every row), which arrive as (position of the first value, values)
+    # batches in row order.  Each batch contributes its own per-bucket
+    # extremes; the extremes of those are the picks.  Returns the picked
+    # values indexed by position.
+    edges = np.linspace(0, len(positions), max(n_out // 2, 1) + 1).astype(np.int64)
+    candidates = []
+    for offset, values in batches:
+        low, high = positions.searchsorted([offset, offset + len(values)])
+        if high == low:
+            continue
+        selected = positions[low:high]
+        frame = pd.DataFrame({
+            "bucket": np.searchsorted(edges, np.arange(low, high), side="right") - 1,
+            "value": np.asarray(values, dtype="float64")[selected - offset],
+        }, index=selected).dropna()
+        grouped = frame.groupby("bucket")["value"]
+        candidates.append(frame.loc[np.union1d(grouped.idxmin(), grouped.idxmax())])
+    if not candidates:
+        return pd.Series(dtype="float64")
+    candidates = pd.concat(candidates)
+    grouped = candidates.groupby("bucket")["value"]
+    return candidates["value"].loc[np.union1d(grouped.idxmin(), grouped.idxmax())]
+
+
+def reduce_series(series, budget, method="lttb"):
+    # Returns (series to draw, whether it is exact)
+    series = series.dropna()
+    if len(series) <= budget:
+        return series, True
+    if pd.api.types.is_numeric_dtype(series.index):
+        x = series.index.to_numpy()
+    else:
+        x = np.arange(len(series))
+    if method == "lttb":
+        picks = lttb_indices(x, series.to_numpy(dtype="float64"), budget)
+    else:
+        picks = minmax_indices(series.to_numpy(dtype="float64"), budget)
+    return series.iloc[picks], False
@@ -0,0 +1,60 @@
+# Ingest-time dtype optimisation.
+#
+# pandas parses every integer column as int64, every real column as float64
+# and every text column as a Python string per cell.  Most uploads fit in far
+# smaller types, and only lossless conversions are applied here.
+import numpy as np
+import pandas as pd
+
+# Text columns with at most this share of distinct values become categoricals
+CATEGORY_RATIO = 0.5
+
+
+def _is_text(series):
+    return series.dtype == object or pd.api.types.is_string_dtype(series)
+
+
+def _downcast_float(series):
+    narrow = series.astype("float32")
+    if np.array_equal(narrow.to_numpy(dtype="float64"), series.to_numpy(), equal_nan=True):
+        return narrow
+    return series
+
+
+def optimize_column(series, category_ratio=CATEGORY_RATIO):
+    # Leave booleans and non-text extension dtypes (Int64, datetimes, ...) alone
+    if pd.api.types.is_bool_dtype(series):
+        return series
+    if not isinstance(series.dtype, np.dtype) and not _is_text(series):
+        return series
+    if pd.api.types.is_integer_dtype(series):
+        return pd.to_numeric(series, downcast="integer")
+    if pd.api.types.is_float_dtype(series):
+        return _downcast_float(series)
+    if _is_text(series) and len(series):
+        if series.nunique(dropna=True) <= category_ratio * len(series):
+            return series.astype("category")
+    return series
+
+
+def optimize_dtypes(frame, category_ratio=CATEGORY_RATIO):
+    # Returns the optimised frame and a report of the memory it saved
+    before = frame.memory_usage(deep=True)
+    columns = {}
+    changed = {}
+    for name in frame.columns:
+        optimized = optimize_column(frame[name], category_ratio)
+        if optimized.dtype != frame[name].dtype:
+            changed[name] = optimized
+            columns[name] = (str(frame[name].dtype), str(optimized.dtype))
+    if changed:
+        frame = frame.copy(deep=False)
+        for name, optimized in changed.items():
+            frame[name] = optimized
+    after = frame.memory_usage(deep=True)
+    report = {
+        "memory_before": int(before.sum()),
+        "memory_after": int(after.sum()),
+        "columns": columns,
+    }
+    return frame, report
@@ -0,0 +1,94 @@
+# Chunked serialisation of row selections for downloads.
+#
+# The download buttons used to call filtered_data.to_csv() on every rerun,
+# whether or not anybody clicked them, and hold the whole CSV string in
+# memory next to the data.  Exports now run only when requested, a block of
+# rows at a time, into a compressed or columnar format when one is
+# available: gzip/zstd CSV shrink the transfer, Parquet and Arrow IPC also
+# skip text formatting entirely.
+import gzip
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # pyarrow is optional; without it only CSV is offered
+    pa = None
+
+try:
+    import zstandard
+except ImportError:  # zstandard is optional; without it no .zst export
+    zstandard = None
+
+EXPORT_CHUNK_ROWS = 100_000
+
+
+class _CsvWriter:
+    def __init__(self, out, compression=None):
+        if compression == "gzip":
+            self.stream = gzip.GzipFile(fileobj=out, mode="wb", compresslevel=6)
+        elif compression == "zstd":
+            self.stream = zstandard.ZstdCompressor(level=3).stream_writer(out, closefd=False)
+        else:
+            self.stream = None
+        self.out = out
+        self.header = True
+
+    def write(self, chunk):
+        text = chunk.to_csv(index=False, header=self.header).encode()
+        (self.stream or self.out).write(text)
+        self.header = False
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.close()
+
+
+class _ArrowWriter:
+    def __init__(self, out, layout):
+        self.out = out
+        self.layout = layout
+        self.writer = None
+
+    def write(self, chunk):
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if self.writer is None:
+            if self.layout == "parquet":
+                self.writer = pa.parquet.ParquetWriter(self.out, table.schema)
+            else:
+                self.writer = pa.ipc.new_file(self.out, table.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+# name -> (file extension, MIME type, writer factory, available)
+FORMATS = {
+    "CSV": ("csv", "text/csv", lambda out: _CsvWriter(out), True),
+    "CSV (gzip)": ("csv.gz", "application/gzip", lambda out: _CsvWriter(out, "gzip"), True),
+    "CSV (zstd)": ("csv.zst", "application/zstd", lambda out: _CsvWriter(out, "zstd"), zstandard is not None),
+    "Parquet": ("parquet", "application/vnd.apache.parquet", lambda out: _ArrowWriter(out, "parquet"), pa is not None),
+    "Arrow IPC": ("arrow", "application/vnd.apache.arrow.file", lambda out: _ArrowWriter(out, "ipc"), pa is not None),
+}
+
+
+def available_formats():
+    return [name for name, (_, _, _, available) in FORMATS.items() if available]
+
+
+def write_rows(rows, format_name, out, on_chunk=None):
+    # Serialise a RowView into the binary file object `out` in blocks of
+    # EXPORT_CHUNK_ROWS rows; on_chunk(done, total) after each block
+    writer = FORMATS[format_name][2](out)
+    dataset = rows.dataset
+    positions = rows.positions
+    total = len(positions)
+    try:
+        for start in range(0, total or 1, EXPORT_CHUNK_ROWS):
+            writer.write(dataset.take(positions[start:start + EXPORT_CHUNK_ROWS]))
+            if on_chunk is not None:
+                on_chunk(min(start + EXPORT_CHUNK_ROWS, total), total)
+    finally:
+        writer.close()
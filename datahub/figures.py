@@ -0,0 +1,60 @@
+# Managed matplotlib figures and a cache of rendered charts.
+#
+# The apps used to call plt.subplots() on every rerun and never close the
+# figure, so pyplot's figure registry grew for the life of the server and
+# every rerun rasterised the same chart again.  Figures here are plain
+# matplotlib.figure.Figure objects that pyplot never sees (which also keeps
+# them safe to use from concurrent sessions); they are borrowed from a small
+# pool and always cleared and handed back, even when drawing fails.  The
+# finished PNG is cached by the caller's key, so an unchanged chart costs a
+# dictionary lookup on the next rerun.
+import io
+import threading
+from contextlib import contextmanager
+
+from datahub.cache import LRUByteCache
+from datahub.config import IMAGE_CACHE_BYTES
+
+try:
+    from matplotlib.figure import Figure
+except ImportError:  # matplotlib is optional; only the static charts need it
+    Figure = None
+
+PNG_DPI = 200
+
+
+class FigurePool:
+    def __init__(self, size=4):
+        self.size = size
+        self._idle = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def axes(self):
+        # Borrow a cleared figure with a single set of axes
+        with self._lock:
+            figure = self._idle.pop() if self._idle else Figure()
+        try:
+            yield figure, figure.add_subplot()
+        finally:
+            figure.clear()
+            with self._lock:
+                if len(self._idle) < self.size:
+                    self._idle.append(figure)
+
+
+figure_pool = FigurePool()
+image_cache = LRUByteCache(IMAGE_CACHE_BYTES)
+
+
+def render_png(key, draw):
+    # PNG bytes of the chart drawn by draw(ax), rendered once per key
+    png = image_cache.get(key)
+    if png is None:
+        with figure_pool.axes() as (figure, ax):
+            draw(ax)
+            buffer = io.BytesIO()
+            figure.savefig(buffer, format="png", dpi=PNG_DPI, bbox_inches="tight")
+        png = buffer.getvalue()
+        image_cache.put(key, png, len(png))
+    return png
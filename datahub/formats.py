@@ -0,0 +1,134 @@
+# Recognising what was uploaded.
+#
+# The uploaders used to take raw CSV only.  A compressed CSV is a fraction
+# of the bytes to send, and a Parquet or Feather file needs no text parsing
+# at all.  The format is read from the leading (magic) bytes rather than the
+# file name, so a renamed file still loads:
+#
+# - gzip, zstd and bz2 are decompressed and the content detected again,
+#   so a compressed CSV goes through the usual CSV ingest.
+# - Parquet and Feather (Arrow IPC) become an Arrow table without parsing.
+# - JSON Lines (a first character of "{") is read with pd.read_json().
+#
+# Anything else is treated as CSV.
+import bz2
+import gzip
+import io
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather
+    import pyarrow.parquet
+except ImportError:  # pyarrow is optional; without it no Parquet/Feather uploads
+    pa = None
+
+try:
+    import zstandard
+except ImportError:  # zstandard is optional; pyarrow can also decompress zstd
+    zstandard = None
+
+CSV = "csv"
+JSONL = "jsonl"
+PARQUET = "parquet"
+FEATHER = "feather"
+
+# (magic bytes, name), compressions first
+_MAGIC = [
+    (b"\x1f\x8b", "gzip"),
+    (b"\x28\xb5\x2f\xfd", "zstd"),
+    (b"BZh", "bz2"),
+    (b"PAR1", PARQUET),
+    (b"ARROW1", FEATHER),
+    (b"FEA1", FEATHER),
+]
+
+
+def _zstd_available():
+    return zstandard is not None or (pa is not None and pa.Codec.is_available("zstd"))
+
+
+def upload_types():
+    # File extensions for st.file_uploader(type=...); only what can be read
+    types = ["csv", "csv.gz", "csv.bz2", "jsonl", "ndjson", "jsonl.gz"]
+    if _zstd_available():
+        types += ["csv.zst"]
+    if pa is not None:
+        types += ["parquet", "feather", "arrow"]
+    return types
+
+
+COMPRESSIONS = ("gzip", "zstd", "bz2")
+# Leading bytes the format is detected from
+_HEAD_BYTES = 1024
+
+
+def detect_format(raw):
+    # `raw` may be any sliceable bytes-like object (e.g. a memory map)
+    head = bytes(raw[:_HEAD_BYTES])
+    for magic, name in _MAGIC:
+        if head.startswith(magic):
+            return name
+    if head.lstrip(b"\xef\xbb\xbf \t\r\n").startswith(b"{"):
+        return JSONL
+    return CSV
+
+
+def _decompressor(source, compression):
+    # `source` is a binary file object
+    if compression == "gzip":
+        return gzip.GzipFile(fileobj=source, mode="rb")
+    if compression == "bz2":
+        return bz2.BZ2File(source)
+    if zstandard is not None:
+        # read_across_frames: files written by the zstd CLI may hold several
+        return zstandard.ZstdDecompressor().stream_reader(source, read_across_frames=True)
+    if _zstd_available():
+        return pa.input_stream(source, compression="zstd")
+    raise ValueError("zstd-compressed uploads need the zstandard package or pyarrow")
+
+
+def open_decompressed(raw):
+    # (binary stream of the content, [compressions applied, outermost
+    # first]); every layer is decompressed as the stream is read
+    stream, compressions = io.BufferedReader(io.BytesIO(raw)), []
+    while True:
+        compression = detect_format(stream.peek(_HEAD_BYTES))
+        if compression not in COMPRESSIONS:
+            return stream, compressions
+        stream = io.BufferedReader(_decompressor(stream, compression))
+        compressions.append(compression)
+
+
+def decompress(raw):
+    # (content, [compressions applied, outermost first])
+    if detect_format(raw) not in COMPRESSIONS:
+        return raw, []
+    stream, compressions = open_decompressed(raw)
+    with stream:
+        return stream.read(), compressions
+
+
+def _require_pyarrow(name):
+    if pa is None:
+        raise ValueError(f"{name} uploads need pyarrow")
+
+
+def read_table(raw, format_name):
+    # Columnar formats as an Arrow table; Feather without compression is
+    # used in place, Parquet is decoded column by column
+    _require_pyarrow(format_name.capitalize())
+    if format_name == PARQUET:
+        return pa.parquet.read_table(pa.BufferReader(raw))
+    return pa.feather.read_table(pa.BufferReader(raw))
+
+
+def parquet_file(raw):
+    # For reading a Parquet upload one column at a time
+    _require_pyarrow("Parquet")
+    return pa.parquet.ParquetFile(pa.BufferReader(raw))
+
+
+def read_json_lines(raw):
+    return pd.read_json(io.BytesIO(raw), lines=True)
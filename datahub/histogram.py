@@ -0,0 +1,97 @@
+# Histograms of "values greater than X" without rescanning the rows.
+#
+# Each numeric column gets FINE_BINS equal-width bins over its full range,
+# stored as cumulative counts over the sorted index.  A coarse histogram of
+# the rows above any threshold has the same edges ax.hist() would pick (the
+# selection's min and max, split evenly).  The number of rows below each
+# coarse edge is then read off the fine cumulative counts.  Where an edge
+# cuts through a fine bin, only that bin's slice of the sorted values is
+# binary-searched, so the counts match np.histogram exactly.  Out-of-core
+# datasets are binned batch by batch on the same edges.
+import numpy as np
+
+from datahub.index import as_numpy, filter_greater, is_indexable, sorted_index
+from datahub.metrics import threshold_metrics
+from datahub.outofcore import ChunkedDataset
+from datahub.predicates import select_greater
+
+FINE_BINS = 4096
+
+
+class FineHistogram:
+    def __init__(self, index):
+        self.index = index
+        values = index.sorted_values
+        self.rows = len(values)
+        if self.rows:
+            self.low, self.high = float(values[0]), float(values[-1])
+        else:
+            self.low = self.high = 0.0
+        self.edges = np.linspace(self.low, self.high, FINE_BINS + 1)
+        # cumulative[j]: rows below fine edge j; the last bin is closed
+        self.cumulative = np.searchsorted(values, self.edges, side="left")
+        self.cumulative[-1] = self.rows
+        self.nbytes = self.edges.nbytes + self.cumulative.nbytes
+
+    def count_below(self, value):
+        # Exact number of rows with a value < `value`
+        if not self.rows or value <= self.low:
+            return 0
+        if value > self.high:
+            return self.rows
+        span = self.high - self.low
+        fine = min(int((value - self.low) / span * FINE_BINS), FINE_BINS - 1) if span else 0
+        # Guard against rounding in the arithmetic bin lookup
+        while fine > 0 and self.edges[fine] > value:
+            fine -= 1
+        while fine < FINE_BINS - 1 and self.edges[fine + 1] <= value:
+            fine += 1
+        start, stop = self.cumulative[fine], self.cumulative[fine + 1]
+        return int(start + np.searchsorted(self.index.sorted_values[start:stop], value, side="left"))
+
+    def counts_greater(self, threshold, bins=20):
+        # (counts, edges) of np.histogram(values[values > threshold], bins)
+        start = self.index.start_greater(threshold)
+        if start == self.rows:
+            return np.zeros(bins, dtype=np.int64), np.linspace(0.0, 1.0, bins + 1)
+        low, high = float(self.index.sorted_values[start]), self.high
+        if low == high:
+            low, high = low - 0.5, high + 0.5
+        edges = np.linspace(low, high, bins + 1)
+        below = [start] + [self.count_below(edge) for edge in edges[1:-1]] + [self.rows]
+        return np.diff(below), edges
+
+
+def fine_histogram(dataset, column):
+    return dataset.derived(("fine_histogram", column), lambda: FineHistogram(sorted_index(dataset, column)))
+
+
+def _scan_histogram(dataset, column, threshold, bins):
+    # Out-of-core datasets: the range comes from the (cached) threshold
+    # metrics, then each record batch adds its counts on the same edges
+    metrics = threshold_metrics(dataset, column, threshold)
+    if not metrics.count:
+        return np.zeros(bins, dtype=np.int64), np.linspace(0.0, 1.0, bins + 1)
+    low, high = metrics.min, metrics.max
+    if low == high:
+        low, high = low - 0.5, high + 0.5
+    edges = np.linspace(low, high, bins + 1)
+    counts = np.zeros(bins, dtype=np.int64)
+    for _, frame in dataset.batches([column]):
+        values = as_numpy(frame[column])
+        counts += np.histogram(values[values > threshold], edges)[0]
+    return counts, edges
+
+
+def threshold_histogram(ax, dataset, column, threshold, color, bins=20):
+    # Same picture as ax.hist(data[data[column] > threshold][column], bins)
+    if isinstance(dataset, ChunkedDataset) and not dataset.is_numeric(column):
+        # Text is drawn as categories; only the matching values are read
+        return ax.hist(select_greater(dataset, column, threshold).column(column), bins=bins, color=color)
+    if isinstance(dataset, ChunkedDataset):
+        counts, edges = _scan_histogram(dataset, column, threshold, bins)
+        return ax.hist(edges[:-1], bins=edges, weights=counts, color=color)
+    if not is_indexable(dataset.column(column)):
+        return ax.hist(filter_greater(dataset, column, threshold)[column], bins=bins, color=color)
+    counts, edges = fine_histogram(dataset, column).counts_greater(threshold, bins)
+    return ax.hist(edges[:-1], bins=edges, weights=counts, color=color)
@@ -0,0 +1,74 @@
+# Sorted per-column index for "values greater than" filters.
+#
+# The dashboards filter with data[data[column] > threshold], which scans the
+# whole column and builds a boolean mask on every slider move.  Sorting a
+# column once turns each threshold into a binary search: the matching rows
+# are simply the tail of the sorted order.
+import numpy as np
+import pandas as pd
+
+
+class SortedColumnIndex:
+    def __init__(self, series):
+        # NaN never compares greater than anything, so keep it out of the index
+        self.order, self.sorted_values = self.sorted_run(series)
+        self.nbytes = self.order.nbytes + self.sorted_values.nbytes
+
+    @classmethod
+    def from_runs(cls, runs):
+        # Merge (positions, values) runs that are each already sorted, as
+        # produced chunk by chunk during streaming ingestion.  The stable sort
+        # is a run-aware merge, so this is far cheaper than a fresh argsort.
+        index = cls.__new__(cls)
+        positions = np.concatenate([run[0] for run in runs])
+        values = np.concatenate([run[1] for run in runs])
+        merge = np.argsort(values, kind="stable")
+        index.order = positions[merge]
+        index.sorted_values = values[merge]
+        index.nbytes = index.order.nbytes + index.sorted_values.nbytes
+        return index
+
+    @staticmethod
+    def sorted_run(series, offset=0):
+        values = as_numpy(series)
+        valid = np.flatnonzero(~pd.isna(values))
+        run = valid[np.argsort(values[valid], kind="stable")]
+        return run + offset, values[run]
+
+    def __len__(self):
+        return len(self.order)
+
+    def start_greater(self, threshold):
+        # Offset into the sorted order of the first value > threshold
+        return int(np.searchsorted(self.sorted_values, threshold, side="right"))
+
+    def positions_greater(self, threshold):
+        # Row positions in value order; a view, no copy
+        return self.order[self.start_greater(threshold):]
+
+    def count_greater(self, threshold):
+        return len(self.order) - self.start_greater(threshold)
+
+
+def as_numpy(series):
+    # Nullable extension dtypes (Int64, Float64) become float64 with NaN holes
+    if isinstance(series.dtype, np.dtype):
+        return series.to_numpy()
+    return series.to_numpy(dtype="float64", na_value=np.nan)
+
+
+def is_indexable(series):
+    return pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+
+
+def sorted_index(dataset, column):
+    return dataset.derived(("sorted_index", column), lambda: SortedColumnIndex(dataset.column(column)))
+
+
+def filter_greater(dataset, column, threshold):
+    # Same rows, in the same order, as data[data[column] > threshold]
+    series = dataset.column(column)
+    if not is_indexable(series):
+        return dataset.take(np.flatnonzero((series > threshold).to_numpy(dtype=bool, na_value=False)))
+    positions = np.sort(sorted_index(dataset, column).positions_greater(threshold))
+    return dataset.take(positions)
@@ -0,0 +1,342 @@
+# Loading uploaded files into cached Datasets.
+import hashlib
+import io
+import itertools
+import time
+from dataclasses import dataclass
+
+import pandas as pd
+
+from datahub.cache import LRUByteCache
+from datahub.config import CHUNK_BYTES, DATASET_CACHE_BYTES, OPTIMIZE_DTYPES, OUT_OF_CORE_BYTES, PREVIEW_SAMPLE_ROWS, SPILL_BYTES, SPILL_DIR
+from datahub.dataset import Dataset
+from datahub.dtypes import optimize_dtypes
+from datahub.formats import COMPRESSIONS, CSV, FEATHER, JSONL, PARQUET, detect_format, open_decompressed, parquet_file, read_json_lines, read_table
+from datahub.index import SortedColumnIndex, is_indexable
+from datahub.lazy import ArrowColumns, CsvColumns, LazyDataset, ParquetColumns
+from datahub.outofcore import ChunkedDataset, chunk_schema, conform
+from datahub.parsing import parse_blocks, parse_csv, resolve_backend
+from datahub.sampling import Reservoir
+from datahub.spill import SpillStore
+from datahub.stats import RunningStats
+
+dataset_cache = LRUByteCache(DATASET_CACHE_BYTES)
+spill_store = SpillStore(SPILL_DIR, SPILL_BYTES)
+
+# Hashing a large upload is not free either, so remember the digest of each
+# recently seen uploaded file; entries are tiny, so this keeps thousands
+_DIGEST_BYTES = 128
+_digests = LRUByteCache(512 * 1024)
+
+
+@dataclass
+class IngestProgress:
+    chunk: int
+    rows: int
+    bytes_read: int
+    total_bytes: int
+    frame: pd.DataFrame
+
+    @property
+    def fraction(self):
+        return min(self.bytes_read / self.total_bytes, 1.0) if self.total_bytes else 1.0
+
+
+def _content_digest(uploaded_file):
+    file_id = getattr(uploaded_file, "file_id", None)
+    memo_key = (file_id, getattr(uploaded_file, "size", None))
+    if file_id is not None:
+        digest = _digests.get(memo_key)
+        if digest is not None:
+            return digest
+    digest = hashlib.blake2b(uploaded_file.getvalue(), digest_size=20).hexdigest()
+    if file_id is not None:
+        _digests.put(memo_key, digest, _DIGEST_BYTES)
+    return digest
+
+
+def upload_key(uploaded_file, **read_options):
+    # The same bytes parsed with different options are different datasets
+    options = ",".join(f"{name}={value!r}" for name, value in sorted(read_options.items()))
+    return f"{_content_digest(uploaded_file)}:{options}"
+
+
+def _rows_per_chunk(raw, chunk_bytes):
+    # Estimate the row width from the head of the file
+    sample = raw[:1024 * 1024]
+    lines = max(sample.count(b"\n"), 1)
+    return max(1000, int(chunk_bytes * lines / max(len(sample), 1)))
+
+
+def _chunks(raw, read_options):
+    # (chunk, bytes parsed so far) in file order; blocks are parsed ahead on
+    # the parse pool unless the pandas backend is configured
+    if resolve_backend(read_options) != "pandas":
+        yield from parse_blocks(raw, CHUNK_BYTES, read_options)
+        return
+    buffer = io.BytesIO(raw)
+    with pd.read_csv(buffer, chunksize=_rows_per_chunk(raw, CHUNK_BYTES), **read_options) as reader:
+        for chunk in reader:
+            yield chunk, buffer.tell()
+
+
+def _parse_streaming(key, raw, on_chunk, read_options):
+    started = time.perf_counter()
+    chunks = []
+    stats = {}
+    runs = {}
+    rows = 0
+    # Row sample for fast previews (see datahub.sampling)
+    sample = Reservoir(PREVIEW_SAMPLE_ROWS)
+    for number, (chunk, bytes_read) in enumerate(_chunks(raw, read_options)):
+        for name in chunk.columns:
+            if name in stats and stats[name] is None:
+                continue
+            if not is_indexable(chunk[name]):
+                # Non-numeric in any chunk means non-numeric overall
+                stats[name] = runs[name] = None
+                continue
+            block = RunningStats.of(chunk[name])
+            stats[name] = stats[name].merge(block) if name in stats else block
+            runs.setdefault(name, []).append(SortedColumnIndex.sorted_run(chunk[name], offset=rows))
+        rows += len(chunk)
+        sample.update(len(chunk))
+        chunks.append(chunk)
+        if on_chunk is not None:
+            on_chunk(IngestProgress(number, rows, bytes_read, len(raw), chunk))
+
+    chunk_count = len(chunks)
+    frame = pd.concat(chunks, ignore_index=True) if chunks else parse_csv(raw, **read_options)
+    del chunks
+    frame, memory_report = _optimize(frame)
+    dataset = Dataset(key, frame)
+    dataset.provide(("reservoir", PREVIEW_SAMPLE_ROWS), sample)
+    for name, column_stats in stats.items():
+        if column_stats is None or not is_indexable(frame[name]):
+            continue
+        index = SortedColumnIndex.from_runs(runs[name])
+        # Downcasting was lossless, so the index can use the narrower type too
+        index.sorted_values = index.sorted_values.astype(frame[name].dtype, copy=False)
+        index.nbytes = index.order.nbytes + index.sorted_values.nbytes
+        dataset.provide(("column_stats", name), column_stats)
+        dataset.provide(("sorted_index", name), index)
+    dataset.ingest_report = {
+        "rows": rows,
+        "chunks": chunk_count,
+        "bytes": len(raw),
+        "seconds": time.perf_counter() - started,
+        **memory_report,
+    }
+    return dataset
+
+
+def _optimize(frame):
+    if not OPTIMIZE_DTYPES:
+        return frame, {}
+    frame, report = optimize_dtypes(frame)
+    return frame, report
+
+
+def _read_frame(raw, format_name):
+    if format_name == JSONL:
+        return read_json_lines(raw)
+    # Columns only: an index stored by pandas comes back as a column
+    return read_table(raw, format_name).to_pandas(ignore_metadata=True)
+
+
+def _format_chunks(raw, format_name, read_options):
+    # (chunk, bytes read so far) for any upload format
+    if format_name == CSV:
+        yield from _chunks(raw, read_options)
+        return
+    if format_name == JSONL:
+        buffer = io.BytesIO(raw)
+        with pd.read_json(buffer, lines=True, chunksize=_rows_per_chunk(raw, CHUNK_BYTES)) as reader:
+            for chunk in reader:
+                yield chunk, buffer.tell()
+        return
+    if format_name == PARQUET:
+        source = parquet_file(raw)
+        rows = source.metadata.num_rows
+        size = sum(source.metadata.row_group(number).total_byte_size for number in range(source.num_row_groups))
+        batches = source.iter_batches(batch_size=max(1000, int(rows * CHUNK_BYTES / max(size, 1))))
+    else:
+        table = read_table(raw, format_name)
+        rows = table.num_rows
+        batches = table.to_batches(max_chunksize=max(1000, int(rows * CHUNK_BYTES / max(table.nbytes, 1))))
+    done = 0
+    for batch in batches:
+        done += batch.num_rows
+        yield batch.to_pandas(ignore_metadata=True), int(len(raw) * done / max(rows, 1))
+
+
+def _load_out_of_core(key, raw, format_name, on_chunk, read_options):
+    # Convert the upload chunk by chunk into an Arrow file in the spill
+    # directory and open that (see datahub.outofcore); None when there is
+    # nowhere to write it
+    if not spill_store.enabled:
+        return None
+    chunks = _format_chunks(raw, format_name, read_options)
+    first = next(chunks, None)
+    if first is None:
+        return None
+    schema = chunk_schema(first[0])
+    report = {"rows": 0, "chunks": 0, "dropped": 0}
+    sample = Reservoir(PREVIEW_SAMPLE_ROWS)
+
+    def batches():
+        for number, (chunk, bytes_read) in enumerate(itertools.chain([first], chunks)):
+            batch, dropped = conform(chunk, schema)
+            report["rows"] += len(chunk)
+            report["chunks"] += 1
+            report["dropped"] += dropped
+            sample.update(len(chunk))
+            if on_chunk is not None:
+                on_chunk(IngestProgress(number, report["rows"], bytes_read, len(raw), chunk))
+            yield batch
+
+    spill_store.save_batches(key, schema, batches())
+    dataset = ChunkedDataset(key, spill_store.load_table(key))
+    dataset.provide(("reservoir", PREVIEW_SAMPLE_ROWS), sample)
+    dataset.ingest_report = {**report, "bytes": len(raw), "out_of_core": True}
+    return dataset
+
+
+def _load_spilled(key):
+    started = time.perf_counter()
+    table = spill_store.load_table(key)
+    if table is None:
+        return None
+    if table.nbytes > OUT_OF_CORE_BYTES:
+        dataset = ChunkedDataset(key, table)
+    else:
+        dataset = Dataset(key, table.to_pandas(split_blocks=True))
+    dataset.ingest_report = {
+        "rows": len(dataset),
+        "chunks": 0,
+        "bytes": 0,
+        "seconds": time.perf_counter() - started,
+        "source": "spill",
+    }
+    return dataset
+
+
+def _load_in_memory(key, raw, format_name, on_chunk, read_options):
+    if format_name != CSV:
+        # Read options describe CSV text and do not apply here
+        frame, memory_report = _optimize(_read_frame(raw, format_name))
+    elif on_chunk is not None:
+        return _parse_streaming(key, raw, on_chunk, read_options)
+    else:
+        frame, memory_report = _optimize(parse_csv(raw, **read_options))
+    dataset = Dataset(key, frame)
+    dataset.ingest_report = {"rows": len(dataset), "chunks": 1, "bytes": len(raw), **memory_report}
+    return dataset
+
+
+def _read_upload(upload):
+    # (content, compressions) of the upload bytes.  Compressed content past
+    # OUT_OF_CORE_BYTES is decompressed into a scratch file in the spill
+    # directory and memory-mapped, rather than held in memory next to the
+    # upload while it is converted out of core.
+    if detect_format(upload) not in COMPRESSIONS:
+        return upload, []
+    stream, compressions = open_decompressed(upload)
+    with stream:
+        pieces, size = [], 0
+        read = lambda: stream.read(CHUNK_BYTES)
+        while size <= OUT_OF_CORE_BYTES or not spill_store.enabled:
+            piece = read()
+            if not piece:
+                return b"".join(pieces), compressions
+            pieces.append(piece)
+            size += len(piece)
+        return spill_store.scratch(itertools.chain(pieces, iter(read, b""))), compressions
+
+
+def _content_within(upload, limit):
+    # Decompressed content of the upload, or None as soon as it passes
+    # `limit` bytes: a large compressed upload is left to load_dataset(),
+    # which streams it, instead of being decompressed in memory first
+    if detect_format(upload) not in COMPRESSIONS:
+        return upload if len(upload) <= limit else None
+    stream, _ = open_decompressed(upload)
+    with stream:
+        content = stream.read(limit + 1)
+    return content if len(content) <= limit else None
+
+
+def load_dataset(uploaded_file, on_chunk=None, **read_options):
+    # With on_chunk the upload is parsed in fixed-size blocks and the callback
+    # sees every block as it arrives; column statistics and sorted indexes are
+    # then built incrementally instead of in a second pass.
+    key = upload_key(uploaded_file, **read_options)
+    dataset = dataset_cache.get(key)
+    if dataset is not None:
+        return dataset
+    dataset = _load_spilled(key)
+    if dataset is None:
+        started = time.perf_counter()
+        upload = uploaded_file.getvalue()
+        upload_bytes = len(upload)
+        raw, compressions = _read_upload(upload)
+        # Only the content is needed from here on
+        del upload
+        format_name = detect_format(raw)
+        if len(raw) > OUT_OF_CORE_BYTES:
+            dataset = _load_out_of_core(key, raw, format_name, on_chunk, read_options)
+        if dataset is None:
+            dataset = _load_in_memory(key, raw, format_name, on_chunk, read_options)
+        dataset.ingest_report.update({
+            "format": format_name,
+            "compression": compressions,
+            "upload_bytes": upload_bytes,
+            "seconds": time.perf_counter() - started,
+        })
+        if not isinstance(dataset, ChunkedDataset):
+            spill_store.save_in_background(key, dataset.frame)
+    dataset.cache_in(dataset_cache, key)
+    return dataset
+
+
+def load_lazy_dataset(uploaded_file, **read_options):
+    # Columns are parsed on first use (see datahub.lazy).  An upload that
+    # some other page already parsed in full is reused as it is.
+    key = upload_key(uploaded_file, **read_options)
+    dataset = dataset_cache.get(key)
+    if dataset is not None:
+        return dataset
+    lazy_key = ("lazy", key)
+    dataset = dataset_cache.get(lazy_key)
+    if dataset is None:
+        started = time.perf_counter()
+        table = spill_store.load_table(key)
+        if table is not None and table.nbytes > OUT_OF_CORE_BYTES:
+            # Too large to load even column by column
+            return load_dataset(uploaded_file, **read_options)
+        if table is not None:
+            dataset = LazyDataset(key, ArrowColumns(table))
+            source = "spill"
+        else:
+            raw = _content_within(uploaded_file.getvalue(), OUT_OF_CORE_BYTES)
+            if raw is None or detect_format(raw) == JSONL:
+                # Out-of-core datasets are never loaded whole anyway, and
+                # there is nothing to project in row-oriented JSON
+                return load_dataset(uploaded_file, **read_options)
+            format_name = detect_format(raw)
+            if format_name == PARQUET:
+                dataset = LazyDataset(key, ParquetColumns(parquet_file(raw), len(raw)))
+            elif format_name == FEATHER:
+                dataset = LazyDataset(key, ArrowColumns(read_table(raw, FEATHER)))
+            else:
+                dataset = LazyDataset(key, CsvColumns(raw, read_options))
+            source = "lazy"
+        dataset.ingest_report = {
+            "columns": len(dataset.columns),
+            "bytes": dataset.nbytes,
+            "seconds": time.perf_counter() - started,
+            "source": source,
+        }
+    # Re-put on every run: the footprint grows as columns are loaded
+    dataset.cache_in(dataset_cache, lazy_key)
+    return dataset
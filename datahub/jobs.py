@@ -0,0 +1,127 @@
+# Background jobs with real progress reporting.
+#
+# Script reruns must stay fast, so slow work is submitted to a process-wide
+# thread pool and the script only polls the job's state.  Jobs are keyed, so
+# resubmitting the same work on a rerun (or from another session) returns the
+# job that is already running or finished instead of starting it again.
+# Finished results are held under a byte budget (export files can be large):
+# past it the least recently used finished jobs are forgotten, and asking
+# for one again reruns it.
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from datahub.config import JOB_RESULT_BYTES, JOB_WORKERS
+
+PENDING, RUNNING, DONE, FAILED = "pending", "running", "done", "failed"
+
+
+class Job:
+    _ids = itertools.count(1)
+
+    def __init__(self, key, name):
+        self.id = next(self._ids)
+        self.key = key
+        self.name = name
+        self.status = PENDING
+        self.progress = 0.0
+        self.message = ""
+        self.result = None
+        # Size of the result, counted against the manager's budget
+        self.nbytes = 0
+        self.error = None
+        self.started = None
+        self.finished = None
+
+    @property
+    def done(self):
+        return self.status in (DONE, FAILED)
+
+    @property
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.perf_counter()) - self.started
+
+    def report(self, fraction, message=None):
+        # Called from inside the job to publish progress
+        self.progress = min(max(fraction, 0.0), 1.0)
+        if message is not None:
+            self.message = message
+
+
+class JobManager:
+    def __init__(self, max_workers, max_jobs=256, max_result_bytes=JOB_RESULT_BYTES):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="datahub-job")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self.max_jobs = max_jobs
+        self.max_result_bytes = max_result_bytes
+        self.result_bytes = 0
+
+    def submit(self, key, name, fn, *args, **kwargs):
+        # Run fn(job, *args, **kwargs) in the background, once per key;
+        # failed jobs are retried on the next submit
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and job.status != FAILED:
+                self._jobs.move_to_end(key)
+                return job
+            if job is not None:
+                self._forget(key)
+            job = Job(key, name)
+            self._jobs[key] = job
+            while len(self._jobs) > self.max_jobs:
+                oldest_key, oldest = next(iter(self._jobs.items()))
+                if not oldest.done:
+                    break
+                self._forget(oldest_key)
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def get(self, key):
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None:
+                self._jobs.move_to_end(key)
+            return job
+
+    def _forget(self, key):
+        # Caller holds the lock
+        self.result_bytes -= self._jobs.pop(key).nbytes
+
+    def _charge(self, job):
+        # Count a finished job's result, then forget the least recently used
+        # finished jobs until the results fit the budget again; the newest
+        # result is kept even when it alone is over
+        result = job.result
+        job.nbytes = len(result) if isinstance(result, (bytes, bytearray)) else getattr(result, "nbytes", 0)
+        with self._lock:
+            if self._jobs.get(job.key) is not job:
+                job.nbytes = 0
+                return
+            self.result_bytes += job.nbytes
+            for key, other in list(self._jobs.items()):
+                if self.result_bytes <= self.max_result_bytes:
+                    break
+                if other is not job and other.done:
+                    self._forget(key)
+
+    def _run(self, job, fn, args, kwargs):
+        job.status = RUNNING
+        job.started = time.perf_counter()
+        try:
+            job.result = fn(job, *args, **kwargs)
+            self._charge(job)
+            job.progress = 1.0
+            job.status = DONE
+        except Exception as error:
+            job.error = error
+            job.status = FAILED
+        finally:
+            job.finished = time.perf_counter()
+
+
+job_manager = JobManager(JOB_WORKERS)
@@ -0,0 +1,212 @@
+# Datasets whose columns are parsed on first use.
+#
+# The single-column apps chart and filter one selected column, but
+# pd.read_csv() materialises every column of a wide export first.  A
+# LazyDataset only reads the header and a sample of rows up front (enough
+# for column names, dtypes and a preview) and converts a column the first
+# time something asks for it.  Memory then grows with the columns used, not
+# the columns present.
+#
+# Columns come from one of two sources:
+#
+# - CsvColumns reads the uploaded bytes.  Every column read still tokenises
+#   the file, but only the requested column is converted and kept (with
+#   pyarrow, multithreaded).  The byte offset of each row is found from the
+#   newlines outside quoted fields, and a page of rows is parsed from just
+#   those lines.
+# - ArrowColumns reads a memory-mapped spill file or a Feather upload, and
+#   ParquetColumns a Parquet upload; either converts a column without
+#   touching the others.
+#
+# Everything else (indexes, metrics, summaries) goes through column() and
+# take() and works unchanged; only .frame reads every column.
+import io
+import threading
+
+import numpy as np
+import pandas as pd
+
+from datahub.config import OPTIMIZE_DTYPES
+from datahub.dataset import Dataset
+from datahub.dtypes import optimize_column
+from datahub.parsing import arrow_convert_options
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv
+except ImportError:  # pyarrow is optional; pandas parses the columns instead
+    pa = None
+
+SAMPLE_ROWS = 1000
+# Larger row selections are assembled from whole columns instead of lines
+LINE_READ_ROWS = 10_000
+
+
+class CsvColumns:
+    def __init__(self, raw, read_options):
+        self.raw = raw
+        self.read_options = read_options
+        self.sample = pd.read_csv(io.BytesIO(raw), nrows=SAMPLE_ROWS, **read_options)
+        self.columns = list(self.sample.columns)
+        self.nbytes = len(raw)
+        self._line_starts = None
+
+    def read_column(self, name):
+        if pa is not None and not self.read_options:
+            # Keep text as text, as pandas would, rather than letting Arrow
+            # guess timestamps
+            types = None if pd.api.types.is_numeric_dtype(self.sample[name]) else {name: pa.string()}
+            try:
+                table = pa.csv.read_csv(
+                    io.BytesIO(self.raw),
+                    parse_options=pa.csv.ParseOptions(newlines_in_values=b'"' in self.raw),
+                    convert_options=arrow_convert_options(include_columns=[name], column_types=types),
+                )
+                return table.column(0).to_pandas().rename(name)
+            except pa.ArrowInvalid:
+                # The column turns to text after the sample; let pandas decide
+                pass
+        return pd.read_csv(io.BytesIO(self.raw), usecols=[name], **self.read_options)[name]
+
+    def line_starts(self):
+        # Byte offset of every data row (plus the end of the last one), or
+        # None when rows cannot be found by splitting on newlines
+        if self._line_starts is None:
+            self._line_starts = self._find_line_starts()
+        return self._line_starts if len(self._line_starts) else None
+
+    def _find_line_starts(self):
+        if self.read_options:
+            return np.empty(0, dtype=np.int64)
+        data = np.frombuffer(self.raw, dtype=np.uint8)
+        ends = np.flatnonzero(data == ord("\n"))
+        if b'"' in self.raw:
+            # A newline ends a row only outside quoted fields, i.e. after an
+            # even number of quotes (see parsing.row_boundaries)
+            quotes = np.flatnonzero(data == ord('"'))
+            ends = ends[np.searchsorted(quotes, ends) % 2 == 0]
+        if not len(ends) or ends[-1] != len(self.raw) - 1:
+            ends = np.r_[ends, len(self.raw)]
+        # Blank lines are skipped by the parser, which would shift the rows
+        lengths = ends[1:] - ends[:-1] - 1
+        blank = (lengths == 0) | ((lengths == 1) & (data[np.minimum(ends[1:] - 1, len(data) - 1)] == ord("\r")))
+        if blank.any():
+            return np.empty(0, dtype=np.int64)
+        return ends + 1
+
+    def rows(self):
+        starts = self.line_starts()
+        return None if starts is None else len(starts) - 1
+
+    def read_rows(self, positions):
+        starts = self.line_starts()
+        if starts is None or len(positions) > LINE_READ_ROWS:
+            return None
+        header = self.raw[:starts[0]]
+        lines = [self.raw[starts[row]:starts[row + 1]].rstrip(b"\r\n") + b"\n" for row in positions]
+        frame = pd.read_csv(io.BytesIO(header + b"".join(lines)))
+        frame.index = pd.Index(positions)
+        return frame
+
+
+class ArrowColumns:
+    def __init__(self, table):
+        self.table = table
+        self.sample = table.slice(0, SAMPLE_ROWS).to_pandas()
+        self.columns = list(table.column_names)
+        # Memory-mapped, so the file costs nothing until columns are read
+        self.nbytes = 0
+
+    def read_column(self, name):
+        return self.table.column(name).to_pandas().rename(name)
+
+    def rows(self):
+        return self.table.num_rows
+
+    def read_rows(self, positions):
+        if len(positions) > LINE_READ_ROWS:
+            return None
+        frame = self.table.take(pa.array(positions)).to_pandas()
+        frame.index = pd.Index(positions)
+        return frame
+
+
+class ParquetColumns:
+    def __init__(self, parquet_file, nbytes):
+        self.file = parquet_file
+        schema = parquet_file.schema_arrow
+        batch = next(parquet_file.iter_batches(batch_size=SAMPLE_ROWS), None)
+        sample = schema.empty_table() if batch is None else pa.Table.from_batches([batch])
+        self.sample = sample.to_pandas(ignore_metadata=True)
+        self.columns = list(schema.names)
+        self.nbytes = nbytes
+
+    def read_column(self, name):
+        # Only this column's pages are decoded
+        return self.file.read(columns=[name]).column(0).to_pandas().rename(name)
+
+    def rows(self):
+        return self.file.metadata.num_rows
+
+    def read_rows(self, positions):
+        return None
+
+
+class LazyDataset(Dataset):
+    def __init__(self, key, source):
+        self.key = key
+        self.source = source
+        self.nbytes = source.nbytes
+        self._columns = {}
+        self._rows = source.rows()
+        self._derived = {}
+        self._lock = threading.RLock()
+        self.ingest_report = {}
+
+    @property
+    def columns(self):
+        return pd.Index(self.source.columns)
+
+    @property
+    def loaded_columns(self):
+        return list(self._columns)
+
+    @property
+    def sample(self):
+        return self.source.sample
+
+    def __len__(self):
+        if self._rows is None:
+            self._rows = len(self.column(self.source.columns[0]))
+        return self._rows
+
+    @property
+    def index(self):
+        return pd.RangeIndex(len(self))
+
+    def column(self, name):
+        with self._lock:
+            if name not in self._columns:
+                if name not in self.source.columns:
+                    raise KeyError(name)
+                series = self.source.read_column(name)
+                if OPTIMIZE_DTYPES:
+                    series = optimize_column(series)
+                self._columns[name] = series
+                self._grow(int(series.memory_usage(deep=True)))
+            return self._columns[name]
+
+    def take(self, positions):
+        # A page of rows is read on its own; larger selections come from
+        # the (loaded on demand) columns
+        positions = np.asarray(positions)
+        loaded = set(self._columns) == set(self.source.columns)
+        frame = None if loaded else self.source.read_rows(positions)
+        if frame is None:
+            frame = pd.concat({name: self.column(name).take(positions) for name in self.source.columns}, axis=1)
+        return frame
+
+    @property
+    def frame(self):
+        # Every column; defeats the purpose, kept for code that needs a frame
+        return pd.concat({name: self.column(name) for name in self.source.columns}, axis=1)
@@ -0,0 +1,99 @@
+# Max/min/mean style metrics for "column > threshold" selections.
+#
+# The metric panels used to call .max(), .min() and .mean() on the filtered
+# column one after another, and st.progress() scanned it once more.  Here all
+# of count/min/max/sum/sum-of-squares/nulls come out of one aggregation and
+# are cached per (dataset, column, threshold).
+#
+# For indexed columns the column is not scanned: the selected values are a
+# suffix of the sorted index, so min and max are its first and last entries.
+# Mean and variance come from Welford moments of every suffix of blocks of
+# the sorted values, built once per column, merged with the moments of the
+# few values of the partial first block.  (Differences of prefix sums of
+# squares would be O(1) but lose the variance of values on a large offset.)
+# Out-of-core datasets have no index; their statistics are merged batch by
+# batch in one pass over the column.
+import numpy as np
+
+from datahub.cache import LRUByteCache
+from datahub.index import as_numpy, is_indexable, sorted_index
+from datahub.outofcore import ChunkedDataset
+from datahub.stats import RunningStats
+from datahub.table import selection_key
+
+# Entries are tiny, so this bounds the cache to tens of thousands of them
+_ENTRY_BYTES = 128
+metrics_cache = LRUByteCache(4 * 1024 ** 2)
+
+
+# Sorted values per block of suffix moments
+SUFFIX_BLOCK = 1024
+
+
+class SuffixMoments:
+    def __init__(self, index):
+        values = index.sorted_values
+        blocks = -(-len(values) // SUFFIX_BLOCK)
+        # suffixes[b] summarises sorted[b * SUFFIX_BLOCK:]; the last is empty
+        self.suffixes = [RunningStats()] * (blocks + 1)
+        for block in range(blocks - 1, -1, -1):
+            part = RunningStats.of(values[block * SUFFIX_BLOCK:(block + 1) * SUFFIX_BLOCK])
+            self.suffixes[block] = part.merge(self.suffixes[block + 1])
+        self.nbytes = _ENTRY_BYTES * len(self.suffixes)
+
+    def suffix(self, values, start):
+        # RunningStats of values[start:] (values being the sorted values)
+        block = -(-start // SUFFIX_BLOCK)
+        head = RunningStats.of(values[start:block * SUFFIX_BLOCK])
+        return head.merge(self.suffixes[block])
+
+
+def suffix_moments(dataset, column):
+    return dataset.derived(("suffix_moments", column), lambda: SuffixMoments(sorted_index(dataset, column)))
+
+
+def _suffix_stats(dataset, column, threshold):
+    index = sorted_index(dataset, column)
+    start = index.start_greater(threshold)
+    if start == len(index):
+        return RunningStats()
+    metrics = suffix_moments(dataset, column).suffix(index.sorted_values, start)
+    # In the column's own type
+    metrics.min, metrics.max = index.sorted_values[start].item(), index.sorted_values[-1].item()
+    return metrics
+
+
+def _scan_stats(dataset, column, threshold):
+    # Out-of-core datasets: merge the statistics of every record batch
+    metrics = RunningStats()
+    for _, frame in dataset.batches([column]):
+        series = frame[column]
+        metrics = metrics.merge(RunningStats.of(as_numpy(series[series > threshold])))
+    return metrics
+
+
+def threshold_metrics(dataset, column, threshold):
+    # RunningStats of dataset[column] over the rows where it is > threshold
+    key = (dataset.key, column, threshold)
+    metrics = metrics_cache.get(key)
+    if metrics is None:
+        if isinstance(dataset, ChunkedDataset):
+            metrics = _scan_stats(dataset, column, threshold)
+        elif is_indexable(dataset.column(column)):
+            metrics = _suffix_stats(dataset, column, threshold)
+        else:
+            series = dataset.column(column)
+            metrics = RunningStats.of(as_numpy(series[series > threshold]))
+        metrics_cache.put(key, metrics, _ENTRY_BYTES)
+    return metrics
+
+
+def selection_metrics(rows, column):
+    # RunningStats of rows[column] over the rows of a RowView, e.g. those of
+    # a compound filter
+    key = (rows.dataset.key, column, selection_key(rows.positions, rows.key))
+    metrics = metrics_cache.get(key)
+    if metrics is None:
+        metrics = RunningStats.of(as_numpy(rows.column(column)))
+        metrics_cache.put(key, metrics, _ENTRY_BYTES)
+    return metrics
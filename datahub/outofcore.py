@@ -0,0 +1,122 @@
+# Datasets larger than memory.
+#
+# pd.read_csv() of an upload several times the size of a pod's memory dies
+# before anything is shown.  Above OUT_OF_CORE_BYTES an upload is never
+# assembled into one frame: every parsed chunk is converted to a fixed
+# schema and appended to an Arrow file in the spill directory, and the
+# dataset is that file, memory-mapped.  The operations the apps run on it
+# (threshold filters, metrics, describe(), value counts, histograms and
+# chart reduction) scan it one record batch at a time; see the
+# ChunkedDataset branches in predicates, metrics, summary, topk, histogram,
+# pyramid and downsample.  Memory then holds one batch plus the result.
+#
+# The schema comes from the first chunk: numeric columns are stored as
+# float64, because a later chunk may have missing values, and everything
+# else as text.  A later value in a numeric column that is not a number is
+# stored as missing and counted in the ingest report.
+import threading
+
+import numpy as np
+import pandas as pd
+
+from datahub.dataset import Dataset
+from datahub.index import is_indexable
+
+try:
+    import pyarrow as pa
+except ImportError:  # pyarrow is optional; without it every upload is read into memory
+    pa = None
+
+
+def chunk_schema(chunk):
+    return pa.schema([
+        pa.field(str(name), pa.float64() if is_indexable(chunk[name]) else pa.string())
+        for name in chunk.columns
+    ])
+
+
+def conform(chunk, schema):
+    # (record batch of `chunk` in `schema`, values that had to be dropped)
+    arrays, dropped = [], 0
+    # Chunks of JSON Lines need not all have the same keys
+    chunk = chunk.reindex(columns=schema.names)
+    for field in schema:
+        series = chunk[field.name]
+        if pa.types.is_floating(field.type):
+            numbers = pd.to_numeric(series, errors="coerce").astype("float64")
+            dropped += int(numbers.isna().sum() - series.isna().sum())
+            arrays.append(pa.array(numbers.to_numpy(), from_pandas=True))
+        else:
+            arrays.append(pa.array(series.astype("string"), type=pa.string(), from_pandas=True))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema), dropped
+
+
+class ChunkedDataset(Dataset):
+    def __init__(self, key, table):
+        self.key = key
+        self.table = table
+        self._batches = table.to_batches()
+        self._offsets = np.cumsum([0] + [batch.num_rows for batch in self._batches])
+        # Memory-mapped: pages are read on demand and belong to the OS cache
+        self.nbytes = 0
+        self._derived = {}
+        self._lock = threading.RLock()
+        self.ingest_report = {}
+
+    @property
+    def columns(self):
+        return pd.Index(self.table.column_names)
+
+    def __len__(self):
+        return self.table.num_rows
+
+    @property
+    def index(self):
+        return pd.RangeIndex(len(self))
+
+    def is_numeric(self, name):
+        field_type = self.table.schema.field(name).type
+        return pa.types.is_integer(field_type) or pa.types.is_floating(field_type)
+
+    def numeric_columns(self):
+        return [name for name in self.table.column_names if self.is_numeric(name)]
+
+    def batches(self, columns):
+        # (position of the first row, frame of `columns`) per record batch
+        for offset, batch in zip(self._offsets, self._batches):
+            yield int(offset), batch.select(columns).to_pandas()
+
+    def read(self, name, start, stop):
+        # Values of one column for rows [start, stop)
+        return self.table.slice(start, max(stop - start, 0)).column(name).to_pandas()
+
+    def _gather(self, positions, columns):
+        positions = np.asarray(positions, dtype=np.int64)
+        if not len(positions):
+            return self.table.schema.empty_table().select(columns).to_pandas()
+        numbers = np.searchsorted(self._offsets, positions, side="right") - 1
+        # Rows are fetched batch by batch, then put back in the order asked for
+        order = np.argsort(numbers, kind="stable")
+        parts = []
+        for number in np.unique(numbers):
+            local = positions[numbers == number] - self._offsets[number]
+            parts.append(self._batches[number].select(columns).take(pa.array(local)).to_pandas())
+        frame = pd.concat(parts, ignore_index=True)
+        frame = frame.take(np.argsort(order))
+        frame.index = pd.Index(positions)
+        return frame
+
+    def take(self, positions):
+        return self._gather(positions, self.table.column_names)
+
+    def column_at(self, name, positions):
+        return self._gather(positions, [name])[name]
+
+    def column(self, name):
+        # The whole column in memory; the chunked scans never need this
+        return self.table.column(name).to_pandas().rename(name)
+
+    @property
+    def frame(self):
+        # Every row in memory, which is what this class exists to avoid
+        return self.table.to_pandas()
@@ -0,0 +1,247 @@
+# Parsing uploaded CSV bytes on every core.
+#
+# pd.read_csv() runs on one thread, so a large upload keeps one core busy
+# while the rest idle.  Three interchangeable backends produce the same
+# frame:
+#
+# - "pandas": pd.read_csv() as before; the reference, and the fallback for
+#   anything the others do not handle.
+# - "arrow": pyarrow's multithreaded CSV reader, configured to infer the
+#   same types and missing values as pandas.
+# - "blocks": the buffer is cut into blocks at row boundaries and the
+#   blocks are parsed by pd.read_csv() on a thread pool (the tokenizer and
+#   number conversion release the GIL).  A newline inside a quoted field is
+#   never taken as a boundary.
+#
+# "auto" picks arrow when pyarrow is installed, otherwise blocks when there
+# is more than one worker.  Either falls back to pandas when the read
+# options go beyond a delimiter, or when the result would differ from a
+# single pandas parse (a column that changes type part-way through the
+# file).  benchmarks/parse_backends.py compares the backends by core count.
+import io
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from datahub.config import PARSE_BACKEND, PARSE_WORKERS
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv
+except ImportError:  # pyarrow is optional; the blocks backend needs only pandas
+    pa = None
+
+BACKENDS = ("auto", "arrow", "blocks", "pandas")
+# Blocks below this size are not worth a thread of their own
+MIN_BLOCK_BYTES = 1024 * 1024
+# The only read options the arrow and blocks backends understand
+_DELIMITER_OPTIONS = {"sep", "delimiter"}
+# Arrow's CPU pool is process-wide; reads that resize it take turns
+_ARROW_POOL_LOCK = threading.Lock()
+# pandas' default missing-value markers, for the arrow reader
+NA_VALUES = [
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+]
+
+
+def _supported(read_options):
+    return set(read_options) <= _DELIMITER_OPTIONS
+
+
+def _delimiter(read_options):
+    return read_options.get("sep", read_options.get("delimiter", ","))
+
+
+def resolve_backend(read_options, backend=None, workers=None):
+    backend = backend or PARSE_BACKEND
+    workers = workers or PARSE_WORKERS
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown parse backend {backend!r}; expected one of {', '.join(BACKENDS)}")
+    if backend == "pandas" or not _supported(read_options) or len(_delimiter(read_options)) != 1:
+        return "pandas"
+    if backend == "auto":
+        if pa is not None:
+            return "arrow"
+        return "blocks" if workers > 1 else "pandas"
+    if backend == "arrow" and pa is None:
+        return "pandas"
+    return backend
+
+
+def arrow_convert_options(include_columns=None, column_types=None):
+    return pa.csv.ConvertOptions(
+        include_columns=include_columns,
+        column_types=column_types,
+        null_values=NA_VALUES,
+        strings_can_be_null=True,
+        true_values=["True", "TRUE", "true"],
+        false_values=["False", "FALSE", "false"],
+    )
+
+
+def _pandas_type(arrow_type):
+    # Types pd.read_csv() itself would produce; anything else (dates,
+    # timestamps, ...) is kept as text, as pandas does
+    return (
+        pa.types.is_integer(arrow_type)
+        or pa.types.is_floating(arrow_type)
+        or pa.types.is_boolean(arrow_type)
+        or pa.types.is_string(arrow_type)
+        or pa.types.is_null(arrow_type)
+    )
+
+
+@contextmanager
+def _arrow_threads(workers):
+    # Arrow ignores a per-read thread count and always uses its global CPU
+    # pool, so a read asking for another worker count resizes the pool for
+    # its duration.  The default (PARSE_WORKERS, normally the core count)
+    # leaves it alone.
+    if workers <= 1 or workers == pa.cpu_count():
+        yield
+        return
+    with _ARROW_POOL_LOCK:
+        previous = pa.cpu_count()
+        pa.set_cpu_count(workers)
+        try:
+            yield
+        finally:
+            pa.set_cpu_count(previous)
+
+
+def _parse_arrow(raw, read_options, workers):
+    parse_options = pa.csv.ParseOptions(delimiter=_delimiter(read_options), newlines_in_values=b'"' in raw)
+    read = pa.csv.ReadOptions(use_threads=workers > 1)
+
+    def read_table(column_types=None):
+        return pa.csv.read_csv(
+            io.BytesIO(raw),
+            read_options=read,
+            parse_options=parse_options,
+            convert_options=arrow_convert_options(column_types=column_types),
+        )
+
+    try:
+        with _arrow_threads(workers):
+            table = read_table()
+            text = {field.name: pa.string() for field in table.schema if not _pandas_type(field.type)}
+            if text:
+                table = read_table(text)
+    except pa.ArrowInvalid:
+        # Typically a column whose type changes after the first block
+        return None
+    if len(set(table.column_names)) != table.num_columns:
+        # Duplicate headers; pandas renames them, Arrow does not
+        return None
+    frame = table.to_pandas()
+    # An all-missing column is float NaN in pandas, not object None
+    for field in table.schema:
+        if pa.types.is_null(field.type):
+            frame[field.name] = np.nan
+    return frame
+
+
+def row_boundaries(raw, parts):
+    # Offsets cutting raw into about `parts` pieces of whole rows: the end
+    # of the header, then newlines outside quoted fields.  A quote count
+    # that is even up to a newline means the newline ends a row ("" escapes
+    # count twice, so they keep the parity).
+    quotes = np.flatnonzero(np.frombuffer(raw, dtype=np.uint8) == ord('"')) if b'"' in raw else None
+
+    def row_end(position):
+        while True:
+            newline = raw.find(b"\n", position)
+            if newline < 0:
+                return len(raw)
+            if quotes is None or np.searchsorted(quotes, newline) % 2 == 0:
+                return newline + 1
+            position = newline + 1
+
+    header_end = row_end(0)
+    bounds = [0, header_end]
+    step = max((len(raw) - header_end) // max(parts, 1), 1)
+    for part in range(1, parts):
+        end = row_end(max(header_end + part * step, bounds[-1]))
+        if end >= len(raw):
+            break
+        if end > bounds[-1]:
+            bounds.append(end)
+    if bounds[-1] < len(raw):
+        bounds.append(len(raw))
+    return bounds
+
+
+def parse_blocks(raw, block_bytes, read_options, workers=None):
+    # Parse raw in blocks of about block_bytes on a thread pool, yielding
+    # (frame, end offset) in file order as each block and all blocks
+    # before it are done.  Each frame infers its own dtypes, as with
+    # pd.read_csv(chunksize=...).
+    workers = workers or PARSE_WORKERS
+    bounds = row_boundaries(raw, max(1, len(raw) // max(block_bytes, 1)))
+    header = pd.read_csv(io.BytesIO(raw[:bounds[1]]), nrows=0, **read_options)
+    names = list(header.columns)
+
+    def parse(number):
+        start, stop = bounds[number + 1], bounds[number + 2]
+        frame = pd.read_csv(io.BytesIO(raw[start:stop]), header=None, names=names, **read_options)
+        frame.index = pd.RangeIndex(len(frame))
+        return frame
+
+    blocks = len(bounds) - 2
+    if blocks <= 0:
+        yield header, len(raw)
+        return
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="datahub-parse") as pool:
+        # Parse at most `workers` blocks ahead of the consumer, so parsed
+        # blocks do not pile up faster than they are used
+        ahead = deque()
+        for number in range(blocks):
+            ahead.append((number, pool.submit(parse, number)))
+            if len(ahead) > workers:
+                done, future = ahead.popleft()
+                yield future.result(), bounds[done + 2]
+        while ahead:
+            done, future = ahead.popleft()
+            yield future.result(), bounds[done + 2]
+
+
+def _consistent(frames):
+    # pd.concat() of the blocks equals one pandas parse when every block
+    # agrees on each column's dtype, or the column is numeric throughout
+    # (int blocks and float blocks widen to float, as pandas would)
+    for name in frames[0].columns:
+        dtypes = {frame[name].dtype for frame in frames}
+        if len(dtypes) > 1 and not all(
+            pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype) for dtype in dtypes
+        ):
+            return False
+    return True
+
+
+def _parse_in_blocks(raw, read_options, workers):
+    parts = min(workers, len(raw) // MIN_BLOCK_BYTES)
+    if parts <= 1:
+        return None
+    frames = [frame for frame, _ in parse_blocks(raw, -(-len(raw) // parts), read_options, workers)]
+    if any(list(frame.columns) != list(frames[0].columns) for frame in frames) or not _consistent(frames):
+        return None
+    return pd.concat(frames, ignore_index=True)
+
+
+def parse_csv(raw, backend=None, workers=None, **read_options):
+    # One DataFrame from CSV bytes, parsed by the configured backend
+    workers = workers or PARSE_WORKERS
+    backend = resolve_backend(read_options, backend, workers)
+    frame = None
+    if backend == "arrow":
+        frame = _parse_arrow(raw, read_options, workers)
+    elif backend == "blocks":
+        frame = _parse_in_blocks(raw, read_options, workers)
+    if frame is None:
+        frame = pd.read_csv(io.BytesIO(raw), **read_options)
+    return frame
@@ -0,0 +1,288 @@
+# Compound row filters over several columns.
+#
+# A predicate is a tree of Range and In conditions joined by And / Or.
+# evaluate() plans it against the dataset instead of evaluating every
+# condition over the full frame:
+#
+# - a filter of a single condition is always a slice of its column's
+#   sorted index (built on first use), as the threshold sliders need;
+# - in a conjunction, a condition on a column with a sorted index is a
+#   slice of that index (two binary searches per range or IN value), and
+#   the most selective such condition picks the candidate rows, as long as
+#   it keeps few enough rows that sorting the slice beats scanning the
+#   column;
+# - the remaining conditions of the conjunction are evaluated together,
+#   only on the candidates' values, into a single boolean mask.  With
+#   numexpr installed the numeric ranges are compiled into one expression;
+#   otherwise each condition is ANDed into the mask in place;
+# - a disjunction is the union of its branches' row positions.
+#
+# Ranges compare a text column's values lexically; on a categorical column
+# (see datahub.dtypes) each category is compared once instead of every row.
+# Comparing values with a bound of another type, e.g. text with a number,
+# is a ValueError.
+#
+# Out-of-core datasets have no indexes, so the whole predicate is evaluated
+# on each record batch of just the columns it mentions, in one pass.
+#
+# No intermediate copy of the frame is made, and the result is a RowView
+# whose key is the predicate's normalised form.  Results are shared between
+# sessions through the query cache.
+import numpy as np
+import pandas as pd
+
+from datahub.index import as_numpy, is_indexable, sorted_index
+from datahub.outofcore import ChunkedDataset
+from datahub.queries import cached_query
+from datahub.views import RowView
+
+try:
+    import numexpr
+except ImportError:  # numexpr is optional; numpy evaluates the same masks
+    numexpr = None
+
+# Largest fraction of the rows an index slice may select and still be used
+INDEX_SELECTIVITY = 0.1
+
+
+class Range:
+    def __init__(self, column, low=None, high=None, low_inclusive=False, high_inclusive=False):
+        self.column = column
+        self.low = low
+        self.high = high
+        self.low_inclusive = low_inclusive
+        self.high_inclusive = high_inclusive
+
+    def key(self):
+        return ("range", self.column, self.low, self.high, self.low_inclusive, self.high_inclusive)
+
+    def __str__(self):
+        parts = []
+        if self.low is not None:
+            parts.append(f"`{self.column}` {'>=' if self.low_inclusive else '>'} {self.low!r}")
+        if self.high is not None:
+            parts.append(f"`{self.column}` {'<=' if self.high_inclusive else '<'} {self.high!r}")
+        return " and ".join(parts) or f"`{self.column}` is anything"
+
+    def index_slice(self, index):
+        values = index.sorted_values
+        start, stop = 0, len(values)
+        if self.low is not None:
+            start = np.searchsorted(values, self.low, side="left" if self.low_inclusive else "right")
+        if self.high is not None:
+            stop = np.searchsorted(values, self.high, side="right" if self.high_inclusive else "left")
+        return index.order[start:max(start, stop)]
+
+    def mask(self, values):
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # Compare every category once, on its own value, and look the
+            # rows' codes up in that; missing rows (code -1) get the False
+            hits = np.append(self.mask(values.cat.categories), False)
+            return hits[values.cat.codes.to_numpy()]
+        result = np.ones(len(values), dtype=bool)
+        try:
+            if self.low is not None:
+                result &= _to_bool(values >= self.low if self.low_inclusive else values > self.low)
+            if self.high is not None:
+                result &= _to_bool(values <= self.high if self.high_inclusive else values < self.high)
+        except TypeError as error:
+            raise ValueError(f"Cannot filter {self}: `{self.column}` holds {values.dtype} values") from error
+        return result
+
+    def expression(self, name, constants):
+        # numexpr source for this range over the array called `name`
+        terms = []
+        if self.low is not None:
+            constants[f"{name}_low"] = self.low
+            terms.append(f"({name} {'>=' if self.low_inclusive else '>'} {name}_low)")
+        if self.high is not None:
+            constants[f"{name}_high"] = self.high
+            terms.append(f"({name} {'<=' if self.high_inclusive else '<'} {name}_high)")
+        return " & ".join(terms)
+
+
+class In:
+    def __init__(self, column, values):
+        self.column = column
+        self.values = list(values)
+
+    def key(self):
+        return ("in", self.column, tuple(sorted(set(self.values), key=repr)))
+
+    def __str__(self):
+        return f"`{self.column}` in {sorted(set(self.values), key=repr)!r}"
+
+    def index_slice(self, index):
+        wanted = np.unique(np.asarray(self.values, dtype="float64"))
+        starts = np.searchsorted(index.sorted_values, wanted, side="left")
+        stops = np.searchsorted(index.sorted_values, wanted, side="right")
+        return np.concatenate([index.order[start:stop] for start, stop in zip(starts, stops)] or [index.order[:0]])
+
+    def mask(self, values):
+        if hasattr(values, "isin"):
+            return _to_bool(values.isin(self.values))
+        return np.isin(values, self.values)
+
+
+class And:
+    def __init__(self, *terms):
+        self.terms = _flatten(And, terms)
+
+    def key(self):
+        return ("and", tuple(sorted((term.key() for term in self.terms), key=repr)))
+
+    def __str__(self):
+        return " AND ".join(f"({term})" for term in self.terms)
+
+
+class Or:
+    def __init__(self, *terms):
+        self.terms = _flatten(Or, terms)
+
+    def key(self):
+        return ("or", tuple(sorted((term.key() for term in self.terms), key=repr)))
+
+    def __str__(self):
+        return " OR ".join(f"({term})" for term in self.terms)
+
+
+def _flatten(kind, terms):
+    flat = []
+    for term in terms:
+        flat.extend(term.terms if isinstance(term, kind) else [term])
+    return flat
+
+
+def _to_bool(result):
+    if hasattr(result, "to_numpy"):
+        return result.to_numpy(dtype=bool, na_value=False)
+    return np.asarray(result, dtype=bool)
+
+
+def _indexed(dataset, condition, build=False):
+    # The sorted index a condition can be answered from, if one was built;
+    # with build=True, built now for any column that can have one
+    if not dataset.has_derived(("sorted_index", condition.column)):
+        if not build or not is_indexable(dataset.column(condition.column)):
+            return None
+    if isinstance(condition, In):
+        try:
+            np.asarray(condition.values, dtype="float64")
+        except (TypeError, ValueError):
+            return None
+    return sorted_index(dataset, condition.column)
+
+
+def _values(dataset, column, candidates):
+    # Values of `column` at the candidate rows (all rows when None): a numpy
+    # array for numeric columns, a Series otherwise
+    series = dataset.column(column)
+    if is_indexable(series):
+        values = as_numpy(series)
+        return values if candidates is None else values[candidates]
+    return series if candidates is None else series.take(candidates)
+
+
+def _estimate(dataset, term):
+    if isinstance(term, (Range, In)):
+        index = _indexed(dataset, term)
+        if index is not None:
+            return len(term.index_slice(index))
+    return len(dataset)
+
+
+def _fused_mask(dataset, conditions, candidates, size):
+    mask = np.ones(size, dtype=bool)
+    numeric = []
+    for condition in conditions:
+        values = _values(dataset, condition.column, candidates)
+        if numexpr is not None and isinstance(condition, Range) and isinstance(values, np.ndarray):
+            numeric.append((condition, values))
+        else:
+            mask &= condition.mask(values)
+    if numeric:
+        arrays, constants, terms = {}, {}, []
+        for number, (condition, values) in enumerate(numeric):
+            name = f"c{number}"
+            arrays[name] = values
+            terms.append(condition.expression(name, constants) or "True")
+        mask &= numexpr.evaluate(" & ".join(terms), local_dict={**arrays, **constants})
+    return mask
+
+
+def _positions(dataset, term, candidates=None):
+    # Ascending row positions matching `term`, within `candidates` if given
+    if isinstance(term, Or):
+        matches = [_positions(dataset, branch, candidates) for branch in term.terms]
+        return np.unique(np.concatenate(matches)) if matches else np.empty(0, dtype=np.int64)
+    terms = term.terms if isinstance(term, And) else [term]
+    if candidates is None and terms:
+        ranked = sorted(((_estimate(dataset, item), number) for number, item in enumerate(terms)))
+        rows, first = ranked[0][0], terms[ranked[0][1]]
+        index = _indexed(dataset, first) if isinstance(first, (Range, In)) else None
+        if index is not None and rows <= INDEX_SELECTIVITY * len(dataset):
+            candidates = np.sort(first.index_slice(index))
+            terms = [terms[number] for _, number in ranked[1:]]
+    nested = [item for item in terms if isinstance(item, (And, Or))]
+    conditions = [item for item in terms if not isinstance(item, (And, Or))]
+    if conditions:
+        size = len(dataset) if candidates is None else len(candidates)
+        mask = _fused_mask(dataset, conditions, candidates, size)
+        candidates = np.flatnonzero(mask) if candidates is None else candidates[mask]
+    elif candidates is None:
+        candidates = np.arange(len(dataset))
+    for item in nested:
+        candidates = _positions(dataset, item, candidates)
+    return candidates
+
+
+def _lone_positions(dataset, condition):
+    # A filter of one condition is a slice of its column's sorted index,
+    # whatever its selectivity, so a new slider threshold costs two binary
+    # searches plus the rows it selects.  The slice is in value order; the
+    # RowView sorts it when sparse and packs it into a bitmap when dense.
+    index = _indexed(dataset, condition, build=True)
+    if index is None:
+        return _positions(dataset, condition)
+    return condition.index_slice(index)
+
+
+def _columns(term):
+    if isinstance(term, (And, Or)):
+        return sorted({column for branch in term.terms for column in _columns(branch)}, key=str)
+    return [term.column]
+
+
+def _batch_mask(term, frame):
+    if isinstance(term, (And, Or)):
+        masks = [_batch_mask(branch, frame) for branch in term.terms]
+        if not masks:
+            return np.full(len(frame), isinstance(term, And))
+        return np.logical_and.reduce(masks) if isinstance(term, And) else np.logical_or.reduce(masks)
+    values = frame[term.column]
+    return term.mask(as_numpy(values) if is_indexable(values) else values)
+
+
+def _scan_positions(dataset, term):
+    # Out-of-core datasets have no indexes: one pass over the record
+    # batches of just the columns the predicate reads
+    matches = [offset + np.flatnonzero(_batch_mask(term, frame)) for offset, frame in dataset.batches(_columns(term))]
+    return np.concatenate(matches) if matches else np.empty(0, dtype=np.int64)
+
+
+def evaluate(dataset, predicate):
+    # The rows matching `predicate`, as a RowView keyed by its normal form
+    key = predicate.key()
+    if isinstance(dataset, ChunkedDataset):
+        find = _scan_positions
+    elif isinstance(predicate, (Range, In)):
+        find = _lone_positions
+    else:
+        find = _positions
+    rows = cached_query(dataset, key, lambda: RowView(dataset, find(dataset, predicate), key=key).bound_to(None))
+    return rows.bound_to(dataset)
+
+
+def select_greater(dataset, column, threshold):
+    # The rows of data[data[column] > threshold], as a RowView
+    return evaluate(dataset, Range(column, threshold))
@@ -0,0 +1,143 @@
+# Multi-resolution level-of-detail pyramid for row-ordered charts.
+#
+# Level k summarises every 2**k consecutive rows of a column by their min,
+# max, sum and non-null count.  Each level is built from the one below, once
+# per column.  Together the levels hold about one bucket per row, 28 bytes
+# each (float64 min, max and sum, int32 count), so an in-memory pyramid
+# costs several times its column; it is charged to the dataset cache along
+# with any float64 copy of the values it keeps.  A chart of any row window then reads the coarsest level that
+# still fits the point budget: the work is proportional to the points drawn,
+# not to the rows in the window.
+#
+# With a "values greater than" threshold a bucket's max is still exact for
+# the selected rows (and a bucket whose max is not above the threshold has
+# none).  Its min is exact when the whole bucket is above the threshold;
+# otherwise the lowest selected value lies between the threshold and the
+# max, and the threshold is drawn as the lower envelope.  The bucket mean
+# (sum / count) is only drawn when every bucket in view lies wholly above
+# the threshold, since it is exact then and unknown otherwise.
+#
+# Out-of-core datasets are built chunk by chunk and keep only the levels
+# that are at most PYRAMID_BUCKETS wide, a few megabytes per column; a view
+# finer than that reads and summarises just the rows of its window.
+import numpy as np
+import pandas as pd
+
+from datahub.config import PYRAMID_BUCKETS
+from datahub.index import as_numpy
+from datahub.outofcore import ChunkedDataset
+
+
+def _buckets(values, width):
+    # (mins, maxs, sums, counts) of every `width` consecutive values
+    if len(values) % width:
+        values = np.append(values, np.full(width - len(values) % width, np.nan))
+    blocks = values.reshape(-1, width)
+    return (
+        np.fmin.reduce(blocks, axis=1),
+        np.fmax.reduce(blocks, axis=1),
+        np.nan_to_num(blocks).sum(axis=1),
+        (~np.isnan(blocks)).sum(axis=1, dtype=np.int32),
+    )
+
+
+def _coarser(level):
+    mins, maxs, sums, counts = level
+    levels = []
+    while len(mins) > 1:
+        if len(mins) % 2:
+            mins, maxs = np.append(mins, np.nan), np.append(maxs, np.nan)
+            sums, counts = np.append(sums, 0.0), np.append(counts, counts.dtype.type(0))
+        mins = np.fmin(mins[0::2], mins[1::2])
+        maxs = np.fmax(maxs[0::2], maxs[1::2])
+        sums = sums[0::2] + sums[1::2]
+        if counts.dtype == np.int32 and counts.max() > np.iinfo(np.int32).max // 2:
+            counts = counts.astype(np.int64)
+        counts = counts[0::2] + counts[1::2]
+        levels.append((mins, maxs, sums, counts))
+    return levels
+
+
+class LevelPyramid:
+    def __init__(self, series):
+        # The column's own values when they are plain numpy numbers; the
+        # float64 copy the levels are built from is dropped afterwards
+        values = as_numpy(series)
+        self.values = values if isinstance(series.dtype, np.dtype) else values.astype("float64", copy=False)
+        self.rows = len(values)
+        self.read = None
+        # levels[k - 1] summarises buckets of 2**k rows
+        self.levels = _coarser(_buckets(values.astype("float64", copy=False), 1))
+        self.nbytes = sum(array.nbytes for level in self.levels for array in level)
+        if not isinstance(series.dtype, np.dtype):
+            self.nbytes += self.values.nbytes
+
+    @classmethod
+    def from_chunks(cls, chunks, rows, read):
+        # Build from the column's values in row order, one chunk at a time,
+        # without holding the column.  Levels finer than PYRAMID_BUCKETS
+        # buckets are not stored; views that need them call read(start,
+        # stop) for the rows in the window and summarise those instead.
+        base = max(0, (rows - 1).bit_length() - PYRAMID_BUCKETS.bit_length() + 1)
+        width = 1 << base
+        parts, carry = [], np.empty(0)
+        for values in chunks:
+            values = np.concatenate((carry, values))
+            whole = len(values) - len(values) % width
+            parts.append(_buckets(values[:whole], width))
+            carry = values[whole:]
+        parts.append(_buckets(carry, width))
+        level = tuple(np.concatenate([part[number] for part in parts]) for number in range(4))
+        pyramid = cls.__new__(cls)
+        pyramid.values = None
+        pyramid.rows = rows
+        pyramid.read = read
+        pyramid.levels = ([None] * (base - 1) + [level] if base else []) + _coarser(level)
+        pyramid.nbytes = sum(array.nbytes for level in pyramid.levels if level is not None for array in level)
+        return pyramid
+
+    def level_for(self, rows, budget):
+        # Coarsest detail needed: smallest k with ceil(rows / 2**k) <= budget
+        level = 0
+        while level < len(self.levels) and -(-rows // (1 << level)) > budget:
+            level += 1
+        return level
+
+    def view(self, start, stop, threshold, budget, level=None):
+        # Frame of the rows in [start, stop) above the threshold, either
+        # exact (level 0) or as per-bucket max/min envelopes; returns
+        # (frame, level)
+        start, stop = max(start, 0), min(stop, self.rows)
+        if level is None:
+            level = self.level_for(stop - start, budget)
+        if self.values is None and (level == 0 or self.levels[level - 1] is None):
+            # Summarise the window's own rows in whole buckets, like the
+            # stored levels do
+            aligned = start >> level << level
+            end = min((((stop - 1) >> level) + 1) << level, self.rows)
+            window = LevelPyramid(self.read(aligned, end))
+            frame, _ = window.view(start - aligned, stop - aligned, threshold, budget, level)
+            frame.index += aligned
+            return frame, level
+        if level == 0:
+            window = self.values[start:stop]
+            keep = np.flatnonzero(window > threshold)
+            return pd.DataFrame({"value": window[keep]}, index=start + keep), 0
+        mins, maxs, sums, counts = self.levels[level - 1]
+        first, last = start >> level, (stop - 1) >> level
+        window = slice(first, last + 1)
+        bucket_max = maxs[window]
+        keep = np.flatnonzero(bucket_max > threshold)
+        bucket_min = mins[window][keep]
+        columns = {"max": bucket_max[keep], "min": np.maximum(bucket_min, threshold)}
+        if (bucket_min > threshold).all():
+            columns["mean"] = sums[window][keep] / counts[window][keep]
+        return pd.DataFrame(columns, index=(first + keep) << level), level
+
+
+def level_pyramid(dataset, column):
+    if isinstance(dataset, ChunkedDataset):
+        chunks = (as_numpy(frame[column]).astype("float64") for _, frame in dataset.batches([column]))
+        build = lambda: LevelPyramid.from_chunks(chunks, len(dataset), lambda start, stop: dataset.read(column, start, stop))
+        return dataset.derived(("level_pyramid", column), build)
+    return dataset.derived(("level_pyramid", column), lambda: LevelPyramid(dataset.column(column)))
@@ -0,0 +1,48 @@
+# Process-wide cache of query results.
+#
+# Sessions exploring the same upload tend to ask the same questions: the
+# same column, the same slider threshold, the same describe().  Results are
+# cached here under (dataset content hash, normalised query), so the second
+# session to ask gets the first session's answer.  One byte budget covers
+# every entry and the least recently used ones are evicted first.
+#
+# cache_statistics() reports hits, misses and sizes for this and the other
+# process-wide caches.
+import pandas as pd
+
+from datahub.cache import LRUByteCache
+from datahub.config import QUERY_CACHE_BYTES
+from datahub.figures import image_cache
+from datahub.ingest import dataset_cache
+from datahub.metrics import metrics_cache
+from datahub.table import order_cache
+
+query_cache = LRUByteCache(QUERY_CACHE_BYTES)
+
+
+def result_nbytes(value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return int(value.memory_usage(deep=True).sum())
+    return int(getattr(value, "nbytes", 0))
+
+
+def cached_query(dataset, query, compute):
+    # compute() once per (dataset, query) for the whole process; `query`
+    # must be a hashable, normalised description of what compute() does
+    key = (dataset.key, query)
+    value = query_cache.get(key)
+    if value is None:
+        value = compute()
+        query_cache.put(key, value, result_nbytes(value))
+    return value
+
+
+def cache_statistics():
+    caches = {
+        "Datasets": dataset_cache,
+        "Query results": query_cache,
+        "Threshold metrics": metrics_cache,
+        "Rendered charts": image_cache,
+        "Table orders": order_cache,
+    }
+    return {name: cache.stats() for name, cache in caches.items()}
@@ -0,0 +1,234 @@
+# Fast previews from a sample of the rows.
+#
+# Dragging a slider over tens of millions of rows redraws charts that look
+# the same from a hundred thousand of them.  Every dataset keeps a
+# reservoir of PREVIEW_SAMPLE_ROWS row positions, filled while the upload
+# is parsed (Algorithm R, a chunk at a time), and sample_dataset() turns it
+# into a SampleDataset: an ordinary Dataset over the sampled rows, so
+# filters, pyramids, describe() and value counts run on it unchanged.  The
+# sample of a LazyDataset gathers each column the first time it is used, so
+# previewing parses only the columns the page shows.
+#
+# A uniform sample can miss a rare group entirely.  Stratified on a column,
+# the rows are split into strata (quantile bins of a numeric column, the
+# most frequent values of a text one) and every stratum is sampled on its
+# own: in proportion to its size, but never with fewer than its share of
+# half the budget.  Each sampled row then stands for N_h / n_h rows of its
+# stratum.
+#
+# estimate_greater() scales the sample's threshold metrics back up with
+# the usual stratified estimators, each with a 95% margin of error.  The
+# sample's min and max are only bounds on the real ones.
+import numpy as np
+import pandas as pd
+
+from datahub.config import PREVIEW_SAMPLE_ROWS
+from datahub.dataset import Dataset
+from datahub.index import as_numpy
+from datahub.lazy import LazyDataset
+from datahub.outofcore import ChunkedDataset
+
+# Quantile bins of a numeric column, most frequent values of a text one
+NUMERIC_STRATA = 10
+TEXT_STRATA = 20
+# Two-sided 95% normal quantile
+Z_95 = 1.96
+
+
+class Reservoir:
+    def __init__(self, capacity, seed=0):
+        self.capacity = capacity
+        self.seen = 0
+        self.positions = np.empty(0, dtype=np.int64)
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, rows):
+        # The next `rows` rows: each row i replaces a random slot with
+        # probability capacity / (i + 1), so every row seen so far is kept
+        # with the same probability
+        start = self.seen
+        self.seen += rows
+        fill = min(max(self.capacity - len(self.positions), 0), rows)
+        self.positions = np.concatenate((self.positions, np.arange(start, start + fill, dtype=np.int64)))
+        rest = np.arange(start + fill, start + rows, dtype=np.int64)
+        slots = (self._rng.random(len(rest)) * (rest + 1)).astype(np.int64)
+        keep = slots < self.capacity
+        slots, rest = slots[keep], rest[keep]
+        # A slot drawn twice in one chunk ends up with the later row
+        slots, last = np.unique(slots[::-1], return_index=True)
+        self.positions[slots] = rest[::-1][last]
+        return self
+
+    @property
+    def nbytes(self):
+        return self.positions.nbytes
+
+
+def reservoir(dataset):
+    # Built during ingest when the upload was parsed in chunks
+    build = lambda: Reservoir(PREVIEW_SAMPLE_ROWS).update(len(dataset))
+    return dataset.derived(("reservoir", PREVIEW_SAMPLE_ROWS), build)
+
+
+class SampleDataset(Dataset):
+    def __init__(self, source, positions, strata, sizes, strata_column=None, seed=0):
+        # Rows at `positions` of `source`; strata[i] is the stratum of the
+        # i-th sampled row and sizes[h] the number of rows of stratum h
+        self.lazy = isinstance(source, LazyDataset)
+        frame = pd.DataFrame(index=pd.Index(positions)) if self.lazy else source.take(positions)
+        super().__init__((source.key, "sample", strata_column, seed), frame)
+        self.source = source
+        self.positions = positions
+        self.strata_column = strata_column
+        self.strata = strata
+        self.sizes = sizes
+        self.counts = np.bincount(strata, minlength=len(sizes))
+
+    @property
+    def population(self):
+        return len(self.source)
+
+    @property
+    def columns(self):
+        return self.source.columns
+
+    def column(self, name):
+        if self.lazy and name not in self.frame.columns:
+            with self._lock:
+                if name not in self.frame.columns:
+                    values = self.source.column_at(name, self.positions)
+                    self.frame[name] = values.set_axis(self.frame.index)
+                    self._grow(int(values.memory_usage(deep=True)))
+        return self.frame[name]
+
+    def take(self, positions):
+        if not self.lazy:
+            return super().take(positions)
+        rows = self.positions[np.asarray(positions)]
+        return self.source.take(rows).set_axis(pd.Index(rows))
+
+
+def _batches(dataset, column):
+    if isinstance(dataset, ChunkedDataset):
+        yield from dataset.batches([column])
+    else:
+        yield 0, dataset.column(column).to_frame()
+
+
+def _stratifier(dataset, column, reference):
+    # (function from a column's values to stratum numbers, stratum count),
+    # with the strata chosen from the values of the uniform sample
+    if dataset.is_numeric(column):
+        values = as_numpy(reference).astype("float64")
+        values = values[~np.isnan(values)]
+        quantiles = np.linspace(0, 1, NUMERIC_STRATA + 1)[1:-1]
+        edges = np.unique(np.quantile(values, quantiles)) if len(values) else np.empty(0)
+        missing = len(edges) + 1
+
+        def label(series):
+            values = as_numpy(series).astype("float64")
+            return np.where(np.isnan(values), missing, np.searchsorted(edges, values, side="right"))
+
+        return label, missing + 1
+    categories = pd.Index(reference.value_counts().index[:TEXT_STRATA - 1])
+    other = len(categories)
+
+    def label(series):
+        codes = categories.get_indexer(series)
+        return np.where(codes < 0, other, codes)
+
+    return label, other + 1
+
+
+def _stratified_positions(dataset, column, capacity, reference, rng):
+    # Two passes over the column: the size of every stratum, then the rows
+    # whose rank within their stratum was drawn at random in between
+    label, count = _stratifier(dataset, column, reference)
+    sizes = np.zeros(count, dtype=np.int64)
+    for _, frame in _batches(dataset, column):
+        sizes += np.bincount(label(frame[column]), minlength=count)
+    share = capacity // (2 * max(np.count_nonzero(sizes), 1))
+    wanted = np.minimum(sizes, np.maximum(np.round(capacity * sizes / max(sizes.sum(), 1)).astype(np.int64), share))
+    # (stratum, rank) pairs encoded as one number
+    width = max(int(sizes.max()), 1)
+    chosen = np.sort(np.concatenate([
+        stratum * width + rng.choice(size, wanted[stratum], replace=False) for stratum, size in enumerate(sizes)
+    ]))
+    seen = np.zeros(count, dtype=np.int64)
+    positions, strata = [], []
+    for offset, frame in _batches(dataset, column):
+        labels = label(frame[column])
+        ranks = seen[labels] + pd.Series(labels).groupby(labels).cumcount().to_numpy()
+        seen += np.bincount(labels, minlength=count)
+        keep = np.isin(labels * width + ranks, chosen)
+        positions.append(offset + np.flatnonzero(keep))
+        strata.append(labels[keep])
+    return np.concatenate(positions), np.concatenate(strata).astype(np.int64), sizes
+
+
+def sample_dataset(dataset, strata_column=None, seed=0):
+    # The dataset's SampleDataset, uniform or stratified on `strata_column`
+    def build():
+        positions = np.sort(reservoir(dataset).positions)
+        if strata_column is None:
+            return SampleDataset(dataset, positions, np.zeros(len(positions), dtype=np.int64), np.array([len(dataset)]), seed=seed)
+        reference = dataset.column_at(strata_column, positions)
+        positions, strata, sizes = _stratified_positions(
+            dataset, strata_column, PREVIEW_SAMPLE_ROWS, reference, np.random.default_rng(seed),
+        )
+        return SampleDataset(dataset, positions, strata, sizes, strata_column, seed)
+
+    return dataset.derived(("sample", strata_column, seed), build)
+
+
+class SampleEstimate:
+    def __init__(self, rows, sample_rows, count, count_margin, total, total_margin, mean, mean_margin, min, max):
+        self.rows = rows
+        # Sampled rows above the threshold
+        self.sample_rows = sample_rows
+        self.count = count
+        self.count_margin = count_margin
+        self.sum = total
+        self.sum_margin = total_margin
+        self.mean = mean
+        self.mean_margin = mean_margin
+        # Of the sample: the real min is at most, the real max at least this
+        self.min = min
+        self.max = max
+
+
+def _variance(frame, column, sizes):
+    # Variance of the stratified estimate of the total of `column`
+    groups = frame.groupby("stratum")[column]
+    variances = groups.var(ddof=1).fillna(0.0)
+    counts = groups.size()
+    totals = sizes[variances.index.to_numpy()]
+    return float((totals ** 2 * (1 - counts / totals) * variances / counts).sum())
+
+
+def estimate_greater(sample, column, threshold):
+    # Estimated count, sum and mean of source[column] over the rows where it
+    # is > threshold, with 95% margins of error
+    values = as_numpy(sample.column(column)).astype("float64")
+    hit = values > threshold
+    frame = pd.DataFrame({"stratum": sample.strata, "hit": hit.astype("float64"), "y": np.where(hit, values, 0.0)})
+    weights = sample.sizes[sample.strata] / sample.counts[sample.strata]
+    count = float((weights * frame["hit"]).sum())
+    total = float((weights * frame["y"]).sum())
+    mean = total / count if count else np.nan
+    # Ratio estimator: the mean's error is that of total - mean * count
+    frame["residual"] = frame["y"] - (0.0 if np.isnan(mean) else mean) * frame["hit"]
+    mean_margin = Z_95 * np.sqrt(_variance(frame, "residual", sample.sizes)) / count if count else np.nan
+    selected = values[hit]
+    return SampleEstimate(
+        rows=len(sample),
+        sample_rows=int(hit.sum()),
+        count=count,
+        count_margin=Z_95 * np.sqrt(_variance(frame, "hit", sample.sizes)),
+        total=total,
+        total_margin=Z_95 * np.sqrt(_variance(frame, "y", sample.sizes)),
+        mean=mean,
+        mean_margin=mean_margin,
+        min=selected.min() if len(selected) else np.nan,
+        max=selected.max() if len(selected) else np.nan,
+    )
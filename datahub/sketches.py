@@ -0,0 +1,115 @@
+# Bounded-memory summaries of a column seen in blocks.
+#
+# KLLSketch: mergeable approximate quantiles.
+# A KLL sketch keeps a few hundred values per column no matter how many it
+# has seen.  Level h holds values that each stand for 2**h originals; when a
+# level overflows it is sorted and every other value is promoted to the next
+# level.  Two sketches merge by concatenating their levels and compacting,
+# which is what lets block summaries be combined for any filter threshold.
+# Rank error is roughly 1.7 / k (about 1% for the default k).
+#
+# FrequentItems: the most frequent values (Misra-Gries).  At most `capacity`
+# counters are kept; when a block brings more distinct values, every count
+# is lowered by the first count that does not fit and the values left at
+# zero are dropped.  Each count is then at most `error` below the truth,
+# and exact while the column has no more than `capacity` distinct values.
+import random
+
+import numpy as np
+import pandas as pd
+
+
+class KLLSketch:
+    def __init__(self, k=200):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self.count = 0
+
+    @classmethod
+    def of(cls, values, k=200):
+        sketch = cls(k)
+        sketch.update(values)
+        return sketch
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def update(self, values):
+        values = np.asarray(values, dtype="float64")
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        self.levels[0] = np.concatenate((self.levels[0], values))
+        self.count += len(values)
+        self._compact()
+
+    def _compact(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # An odd item out stays behind so every promoted value has a partner
+                keep = items[:1] if len(items) % 2 else items[:0]
+                pairs = items[len(keep):]
+                promoted = pairs[random.getrandbits(1)::2]
+                self.levels[level] = keep
+                self.levels[level + 1] = np.concatenate((self.levels[level + 1], promoted))
+            level += 1
+
+    def merge(self, other):
+        merged = KLLSketch(max(self.k, other.k))
+        depth = max(len(self.levels), len(other.levels))
+        merged.levels = [
+            np.concatenate((
+                self.levels[h] if h < len(self.levels) else np.empty(0),
+                other.levels[h] if h < len(other.levels) else np.empty(0),
+            ))
+            for h in range(depth)
+        ]
+        merged.count = self.count + other.count
+        merged._compact()
+        return merged
+
+    @property
+    def nbytes(self):
+        return sum(level.nbytes for level in self.levels)
+
+    def quantiles(self, qs):
+        if not self.count:
+            return [np.nan for _ in qs]
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2 ** h, dtype="float64") for h, items in enumerate(self.levels)])
+        order = np.argsort(values, kind="stable")
+        values = values[order]
+        ranks = np.cumsum(weights[order])
+        total = ranks[-1]
+        positions = np.searchsorted(ranks, np.asarray(qs) * total, side="left")
+        return values[np.minimum(positions, len(values) - 1)].tolist()
+
+
+class FrequentItems:
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self.counts = pd.Series(dtype="int64")
+        # Values seen, and the most any count can be short by
+        self.total = 0
+        self.error = 0
+
+    def update(self, values):
+        block = pd.Series(values).value_counts()
+        if not len(block):
+            return
+        self.total += int(block.sum())
+        self.counts = self.counts.add(block, fill_value=0).astype("int64")
+        if len(self.counts) > self.capacity:
+            cut = int(self.counts.nlargest(self.capacity + 1).iloc[-1])
+            self.counts = self.counts[self.counts > cut] - cut
+            self.error += cut
+
+    @property
+    def nbytes(self):
+        return int(self.counts.memory_usage(deep=True))
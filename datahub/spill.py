@@ -0,0 +1,112 @@
+# On-disk Arrow (Feather v2) copies of parsed uploads.
+#
+# Files are written uncompressed so that a later load can memory-map them
+# and hand numeric columns to pandas without copying.  The directory is kept
+# under a byte budget by deleting the least recently used files.
+import hashlib
+import mmap
+import os
+import tempfile
+import threading
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.ipc
+except ImportError:  # pyarrow is optional; without it nothing is spilled
+    feather = None
+
+
+class SpillStore:
+    suffix = ".arrow"
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return feather is not None and bool(self.directory)
+
+    def path(self, key):
+        name = hashlib.blake2b(key.encode(), digest_size=20).hexdigest()
+        return os.path.join(self.directory, name + self.suffix)
+
+    def load_table(self, key):
+        # The spilled file as a memory-mapped Arrow table; nothing is read
+        # until a column is converted
+        if not self.enabled:
+            return None
+        path = self.path(key)
+        try:
+            table = feather.read_table(path, memory_map=True)
+            # Mark as recently used for eviction
+            os.utime(path)
+        except (FileNotFoundError, OSError):
+            return None
+        return table
+
+    def save(self, key, frame):
+        if self.enabled:
+            self._write(key, lambda path: feather.write_feather(frame, path, compression="uncompressed"))
+
+    def save_batches(self, key, schema, batches):
+        # Write record batches as they are produced, holding one at a time;
+        # returns whether the file was written
+        if not self.enabled:
+            return False
+
+        def write(path):
+            with pa.ipc.new_file(path, schema) as writer:
+                for batch in batches:
+                    writer.write_batch(batch)
+
+        self._write(key, write)
+        return True
+
+    def _write(self, key, write):
+        os.makedirs(self.directory, exist_ok=True)
+        # Write to a temporary name first so readers never see partial files
+        handle, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(handle)
+        try:
+            write(tmp_path)
+            os.replace(tmp_path, self.path(key))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.evict()
+
+    def scratch(self, pieces):
+        # Write the bytes in `pieces` to an unnamed file in the spill
+        # directory and map it read-only; the file goes away with the map
+        os.makedirs(self.directory, exist_ok=True)
+        with tempfile.TemporaryFile(dir=self.directory) as file:
+            for piece in pieces:
+                file.write(piece)
+            file.flush()
+            return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def save_in_background(self, key, frame):
+        if self.enabled:
+            threading.Thread(target=self.save, args=(key, frame), daemon=True).start()
+
+    def evict(self):
+        with self._lock:
+            try:
+                entries = [entry for entry in os.scandir(self.directory) if entry.name.endswith(self.suffix)]
+            except FileNotFoundError:
+                return
+            entries.sort(key=lambda entry: entry.stat().st_mtime)
+            total = sum(entry.stat().st_size for entry in entries)
+            # The newest file is the one just written and may be in use
+            for entry in entries[:-1]:
+                if total <= self.max_bytes:
+                    break
+                total -= entry.stat().st_size
+                try:
+                    os.remove(entry.path)
+                except (FileNotFoundError, PermissionError):
+                    pass
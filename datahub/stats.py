@@ -0,0 +1,118 @@
+# Mergeable per-column summary statistics.
+#
+# RunningStats can be computed for any block of a column and merged with the
+# statistics of other blocks, so a column can be summarised chunk by chunk
+# while it is still being parsed.
+import math
+
+import numpy as np
+
+
+class RunningStats:
+    # Count, nulls, min, max and the Welford mean and sum of squared
+    # deviations (m2).  Raw sums of squares lose every digit of the variance
+    # once the values sit on a large offset (timestamps, ids); deviations
+    # from the mean do not, and Chan's update merges them just as cheaply.
+    __slots__ = ("count", "nulls", "min", "max", "mean", "m2")
+
+    def __init__(self, count=0, nulls=0, min=math.nan, max=math.nan, mean=math.nan, m2=0.0):
+        self.count = count
+        self.nulls = nulls
+        self.min = min
+        self.max = max
+        self.mean = mean
+        self.m2 = m2
+
+    @classmethod
+    def of(cls, values):
+        values = np.asarray(values, dtype="float64")
+        valid = values[~np.isnan(values)]
+        if not len(valid):
+            return cls(nulls=len(values))
+        mean = float(valid.mean())
+        deviations = valid - mean
+        return cls(
+            count=len(valid),
+            nulls=len(values) - len(valid),
+            min=float(valid.min()),
+            max=float(valid.max()),
+            mean=mean,
+            m2=float(np.dot(deviations, deviations)),
+        )
+
+    def merge(self, other):
+        if not other.count:
+            return RunningStats(self.count, self.nulls + other.nulls, self.min, self.max, self.mean, self.m2)
+        if not self.count:
+            return RunningStats(other.count, self.nulls + other.nulls, other.min, other.max, other.mean, other.m2)
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        return RunningStats(
+            count,
+            self.nulls + other.nulls,
+            min(self.min, other.min),
+            max(self.max, other.max),
+            self.mean + delta * other.count / count,
+            self.m2 + other.m2 + delta * delta * self.count * other.count / count,
+        )
+
+    @property
+    def sum(self):
+        return self.mean * self.count if self.count else 0.0
+
+    @property
+    def var(self):
+        # Sample variance, matching pandas' ddof=1 default
+        if self.count < 2:
+            return math.nan
+        return self.m2 / (self.count - 1)
+
+    @property
+    def std(self):
+        return math.sqrt(self.var)
+
+
+class Moments:
+    # Welford/Chan running mean and sum of squared deviations, without the
+    # null count; what describe() keeps per block of a column.
+    __slots__ = ("count", "mean", "m2", "min", "max")
+
+    def __init__(self, count=0, mean=0.0, m2=0.0, min=math.nan, max=math.nan):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+        self.min = min
+        self.max = max
+
+    @classmethod
+    def of(cls, values):
+        values = np.asarray(values, dtype="float64")
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return cls()
+        mean = float(values.mean())
+        deviations = values - mean
+        return cls(len(values), mean, float(np.dot(deviations, deviations)), float(values.min()), float(values.max()))
+
+    def merge(self, other):
+        if not other.count:
+            return self
+        if not self.count:
+            return other
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        return Moments(
+            count,
+            self.mean + delta * other.count / count,
+            self.m2 + other.m2 + delta * delta * self.count * other.count / count,
+            min(self.min, other.min),
+            max(self.max, other.max),
+        )
+
+    @property
+    def var(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else math.nan
+
+    @property
+    def std(self):
+        return math.sqrt(self.var)
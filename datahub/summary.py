@@ -0,0 +1,169 @@
+# Summary statistics for "column > threshold" selections without re-sorting.
+#
+# filtered_data.describe() re-sorts every numeric column for its quantiles on
+# every rerun.  Instead, the rows are laid out in the order of the filter
+# column's sorted index and cut into blocks.  Each numeric column gets
+# Welford moments and a KLL sketch for every suffix of blocks.  A threshold
+# selects a suffix of that order, i.e. a partial block plus whole blocks, so
+# describe() becomes one precomputed suffix merged with the few rows of the
+# partial block.  Counts, means, std, min and max are exact; quantiles are
+# approximate except for the filter column itself, whose selected values are
+# already sorted.  A column's suffixes are built the first time describe()
+# on that filter column needs them, and never for the filter column itself.
+# exact=True falls back to pandas.  Out-of-core datasets are summarised in
+# one pass over their record batches instead.
+import numpy as np
+import pandas as pd
+
+from datahub.index import as_numpy, is_indexable, sorted_index
+from datahub.metrics import threshold_metrics
+from datahub.outofcore import ChunkedDataset
+from datahub.predicates import select_greater
+from datahub.sketches import KLLSketch
+from datahub.stats import Moments
+
+QUANTILES = (0.25, 0.5, 0.75)
+DESCRIBE_INDEX = ["count", "mean", "std", "min", "25%", "50%", "75%", "max"]
+# At most this many blocks per filter column, so the partial block stays small
+# relative to the data while the stored suffixes stay bounded
+MAX_BLOCKS = 256
+MIN_BLOCK_ROWS = 4096
+
+
+class ColumnSuffixes:
+    # Moments and KLL sketch of every suffix of blocks of one column, with
+    # the rows in the filter column's sorted order
+    def __init__(self, values, block_rows, blocks):
+        moments, sketch = Moments(), KLLSketch()
+        self.suffixes = [None] * blocks
+        self.nbytes = 0
+        for block in range(blocks - 1, -1, -1):
+            chunk = values[block * block_rows:(block + 1) * block_rows]
+            moments = moments.merge(Moments.of(chunk))
+            sketch = sketch.merge(KLLSketch.of(chunk))
+            self.suffixes[block] = (moments, sketch)
+            self.nbytes += sketch.nbytes
+
+
+class BlockSummaries:
+    def __init__(self, dataset, column):
+        index = sorted_index(dataset, column)
+        self.column = column
+        self.order = index.order
+        rows = len(self.order)
+        self.block_rows = max(MIN_BLOCK_ROWS, -(-rows // MAX_BLOCKS))
+        self.blocks = -(-rows // self.block_rows)
+        self.columns = [name for name in dataset.columns if dataset.is_numeric(name)]
+        # Only the layout; the suffixes are per column and built on first use
+        self.nbytes = 0
+
+    def suffixes(self, dataset, name):
+        def build():
+            values = as_numpy(dataset.column(name)).astype("float64", copy=False)[self.order]
+            return ColumnSuffixes(values, self.block_rows, self.blocks)
+
+        return dataset.derived(("block_suffixes", self.column, name), build).suffixes
+
+    def describe_suffix(self, dataset, start):
+        # Summaries of the rows at sorted-order offsets [start, rows), for
+        # every numeric column but the filter column itself, which
+        # describe_greater() takes from its sorted index
+        first_full = -(-start // self.block_rows)
+        partial = self.order[start:first_full * self.block_rows]
+        result = {}
+        for name in self.columns:
+            if name == self.column:
+                continue
+            values = as_numpy(dataset.column(name)).astype("float64", copy=False)[partial]
+            moments, sketch = Moments.of(values), KLLSketch.of(values)
+            if first_full < self.blocks:
+                full_moments, full_sketch = self.suffixes(dataset, name)[first_full]
+                moments, sketch = moments.merge(full_moments), sketch.merge(full_sketch)
+            result[name] = _describe_values(moments, sketch.quantiles(QUANTILES))
+        return result
+
+
+def _describe_values(moments, quantiles):
+    return [float(moments.count), moments.mean if moments.count else np.nan, moments.std,
+            moments.min, *quantiles, moments.max]
+
+
+def _sorted_quantiles(values, qs):
+    # Linear interpolation on already sorted values, as pandas does
+    if not len(values):
+        return [np.nan for _ in qs]
+    positions = (len(values) - 1) * np.asarray(qs)
+    lower = np.floor(positions).astype(int)
+    upper = np.minimum(lower + 1, len(values) - 1)
+    fraction = positions - lower
+    low, high = values[lower].astype("float64"), values[upper].astype("float64")
+    return (low + (high - low) * fraction).tolist()
+
+
+def block_summaries(dataset, column):
+    return dataset.derived(("block_summaries", column), lambda: BlockSummaries(dataset, column))
+
+
+def _scan_describe(dataset, column=None, threshold=None, positions=None):
+    # Out-of-core datasets: moments and a KLL sketch per numeric column,
+    # merged over the record batches in one pass.  Only the quantiles are
+    # approximate, whatever `exact` asks for.  Selects the rows where
+    # column > threshold, the rows at (sorted) `positions`, or every row.
+    columns = dataset.numeric_columns()
+    summaries = {name: (Moments(), KLLSketch()) for name in columns}
+    for offset, frame in dataset.batches(sorted({column, *columns} - {None}, key=str)):
+        if column is not None:
+            selected = (frame[column] > threshold).to_numpy(dtype=bool, na_value=False)
+        elif positions is not None:
+            low, high = np.searchsorted(positions, [offset, offset + len(frame)])
+            selected = positions[low:high] - offset
+        else:
+            selected = slice(None)
+        for name in columns:
+            values = as_numpy(frame[name]).astype("float64", copy=False)[selected]
+            moments, sketch = summaries[name]
+            sketch.update(values)
+            summaries[name] = (moments.merge(Moments.of(values)), sketch)
+    described = {
+        name: _describe_values(moments, sketch.quantiles(QUANTILES)) for name, (moments, sketch) in summaries.items()
+    }
+    return pd.DataFrame(described, index=DESCRIBE_INDEX, columns=columns)
+
+
+def describe_greater(dataset, column, threshold, exact=False):
+    # describe() of the rows where column > threshold
+    if isinstance(dataset, ChunkedDataset):
+        return _scan_describe(dataset, column, threshold)
+    if exact or not is_indexable(dataset.column(column)):
+        return select_greater(dataset, column, threshold).frame().describe()
+    index = sorted_index(dataset, column)
+    start = index.start_greater(threshold)
+    summaries = block_summaries(dataset, column)
+    if not summaries.columns:
+        return select_greater(dataset, column, threshold).frame().describe()
+    described = summaries.describe_suffix(dataset, start)
+    # The filter column's own values are a sorted suffix: exact, from one
+    # partial block and a stored suffix
+    metrics = threshold_metrics(dataset, column, threshold)
+    described[column] = [
+        float(metrics.count), metrics.mean, metrics.std, float(metrics.min),
+        *_sorted_quantiles(index.sorted_values[start:], QUANTILES), float(metrics.max),
+    ]
+    return pd.DataFrame(described, index=DESCRIBE_INDEX, columns=summaries.columns)
+
+
+def describe_all(dataset):
+    # describe() of every row, one column at a time
+    if isinstance(dataset, ChunkedDataset):
+        return _scan_describe(dataset)
+    columns = [name for name in dataset.columns if dataset.is_numeric(name)]
+    return pd.DataFrame({name: dataset.column(name).describe() for name in columns}, index=DESCRIBE_INDEX, columns=columns)
+
+
+def describe_rows(rows):
+    # describe() of the rows of a RowView, whatever filter produced them
+    dataset = rows.dataset
+    if isinstance(dataset, ChunkedDataset):
+        return _scan_describe(dataset, positions=rows.positions)
+    columns = [name for name in dataset.columns if dataset.is_numeric(name)]
+    return pd.DataFrame({name: rows.column(name).describe() for name in columns}, index=DESCRIBE_INDEX, columns=columns)
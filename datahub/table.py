@@ -0,0 +1,72 @@
+# Row orders for paged tables.
+#
+# st.dataframe(data) and st.table(filtered_data) serialise every row to the
+# browser on every rerun.  Tables now keep the rows on the server and ship a
+# single page.  Only the display order is needed for that: the selection's
+# own row order, or its rows sorted by one column.  Sorting an indexed
+# column reuses the column's sorted index (restricted to the selection)
+# instead of sorting the values again.  Sorted orders are cached per
+# (dataset, selection, column, direction), so paging through a sorted table
+# costs a slice of the cached order.
+import hashlib
+
+import numpy as np
+
+from datahub.cache import LRUByteCache
+from datahub.index import as_numpy, is_indexable, sorted_index
+
+order_cache = LRUByteCache(256 * 1024 ** 2)
+
+
+def selection_key(positions, key=None):
+    # Identify a selection by the filter that produced it, or by its rows
+    if key is not None:
+        return key
+    if positions is None:
+        return ("all",)
+    return ("rows", hashlib.blake2b(positions.tobytes(), digest_size=16).hexdigest())
+
+
+def display_order(dataset, positions, column, descending=False, key=None):
+    # Row positions of the selection (None for every row) sorted by
+    # `column`, missing values last; None when no sort is requested
+    if column is None:
+        return positions
+    cache_key = (dataset.key, selection_key(positions, key), column, descending)
+    order = order_cache.get(cache_key)
+    if order is None:
+        order = _sorted_positions(dataset, positions, column, descending)
+        order_cache.put(cache_key, order, order.nbytes)
+    return order
+
+
+def _sorted_positions(dataset, positions, column, descending):
+    series = dataset.column(column)
+    rows = np.arange(len(dataset)) if positions is None else positions
+    if is_indexable(series):
+        index = sorted_index(dataset, column)
+        ordered, values = index.order, index.sorted_values
+        if positions is not None:
+            member = np.zeros(len(dataset), dtype=bool)
+            member[positions] = True
+            keep = member[ordered]
+            ordered, values = ordered[keep], values[keep]
+        missing = rows[np.isnan(as_numpy(series)[rows])]
+        if descending:
+            ordered = _reverse_keeping_ties(ordered, values)
+        return np.concatenate([ordered, missing])
+    selected = series.take(rows).reset_index(drop=True)
+    ranks = selected.sort_values(ascending=not descending, kind="stable", na_position="last").index
+    return rows[ranks.to_numpy()]
+
+
+def _reverse_keeping_ties(ordered, values):
+    # Descending order from an ascending one, with equal values still in
+    # row order, as sort_values(ascending=False, kind="stable") has them
+    if not len(ordered):
+        return ordered
+    ordered, values = ordered[::-1], values[::-1]
+    starts = np.flatnonzero(np.r_[True, values[1:] != values[:-1]])
+    stops = np.r_[starts[1:], len(values)]
+    run = np.repeat(np.arange(len(starts)), stops - starts)
+    return ordered[starts[run] + stops[run] - 1 - np.arange(len(ordered))]
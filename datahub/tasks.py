@@ -0,0 +1,61 @@
+# Work that the apps run as background jobs.
+import io
+
+from datahub.export import write_rows
+from datahub.histogram import fine_histogram
+from datahub.index import sorted_index
+from datahub.metrics import suffix_moments, threshold_metrics
+from datahub.outofcore import ChunkedDataset
+from datahub.pyramid import level_pyramid
+from datahub.summary import describe_greater
+from datahub.topk import count_table
+
+
+# What each kind of chart reads besides the filter column's sorted index and
+# suffix moments (filters and metrics)
+CHART_STRUCTURES = {
+    "pyramid": [level_pyramid],
+    "histogram": [fine_histogram],
+    "pie": [count_table],
+}
+
+
+def prepare_dataset(job, dataset, column, chart=None):
+    # Build what the page's filter column and chart read, ahead of the first
+    # interaction that needs it.  Each structure is also built on first use
+    # and charged to the dataset cache; this only moves the wait off the
+    # script.
+    if column not in dataset.columns or not dataset.is_numeric(column):
+        job.report(1.0, "Nothing to index")
+        return 0
+    builds = CHART_STRUCTURES.get(chart, [])
+    if isinstance(dataset, ChunkedDataset):
+        # Only the pyramid is built a batch at a time; the rest are scans
+        builds = [build for build in builds if build is level_pyramid]
+    else:
+        builds = [sorted_index, suffix_moments, *builds]
+    for number, build in enumerate(builds):
+        job.report(number / len(builds), f"Indexing `{column}`")
+        build(dataset, column)
+    job.report(1.0, f"Indexed `{column}`")
+    return len(builds)
+
+
+def exact_summary(job, dataset, column, threshold):
+    # Exact threshold metrics and describe() over every row, for pages that
+    # show estimates from a sample (see datahub.sampling)
+    job.report(0.0, "Computing exact metrics")
+    metrics = threshold_metrics(dataset, column, threshold)
+    job.report(0.5, "Computing exact summary statistics")
+    return metrics, describe_greater(dataset, column, threshold, exact=True)
+
+
+def export_rows(job, rows, format_name):
+    # Serialise a RowView in one of export.FORMATS; returns the file's bytes
+    buffer = io.BytesIO()
+
+    def report(done, total):
+        job.report(done / total if total else 1.0, f"Exported {done:,} of {total:,} rows")
+
+    write_rows(rows, format_name, buffer, report)
+    return buffer.getvalue()
@@ -0,0 +1,85 @@
+# Top-K categories with an "Other" remainder, for pie charts.
+#
+# value_counts() over the filtered rows hands every distinct value to the
+# pie, which means hundreds of thousands of slices on a continuous column.
+# For numeric columns the sorted index already holds the values in order,
+# so one pass over it gives a count table of (distinct value, count) pairs,
+# itself in value order.  The distinct values above any threshold are then a
+# suffix of that table, and the K largest counts come from an argpartition
+# over the suffix.  Everything past the first K is folded into one "Other"
+# slice, so a pie never has more than K + 1 wedges.  Out-of-core datasets
+# are counted batch by batch with a FrequentItems sketch, whose undercounts
+# end up in "Other".
+import numpy as np
+import pandas as pd
+
+from datahub.index import filter_greater, is_indexable, sorted_index
+from datahub.outofcore import ChunkedDataset
+from datahub.sketches import FrequentItems
+
+TOP_K = 10
+OTHER = "Other"
+
+
+class CountTable:
+    def __init__(self, index):
+        values = index.sorted_values
+        if len(values):
+            starts = np.flatnonzero(np.r_[True, values[1:] != values[:-1]])
+            self.values = values[starts]
+            self.counts = np.diff(np.r_[starts, len(values)])
+        else:
+            self.values, self.counts = values[:0], np.zeros(0, dtype=np.int64)
+        self.nbytes = self.values.nbytes + self.counts.nbytes
+
+    def top_greater(self, threshold, k=TOP_K):
+        # value_counts() of the values > threshold, cut to k entries plus
+        # the remainder under OTHER
+        start = int(np.searchsorted(self.values, threshold, side="right"))
+        return _top(pd.Series(self.counts[start:], index=self.values[start:]), k)
+
+
+def _top(counts, k, total=None):
+    # `total` counts values missing from `counts` as well (see FrequentItems)
+    total = counts.sum() if total is None else total
+    if len(counts) > k:
+        keep = np.argpartition(-counts.to_numpy(), k - 1)[:k]
+        top = counts.iloc[keep]
+    else:
+        top = counts
+    other = total - top.sum()
+    # Largest first, ties in value order, as value_counts() would list them
+    top = top.iloc[np.argsort(-top.to_numpy(), kind="stable")]
+    if other:
+        top = pd.concat([top, pd.Series([other], index=[OTHER])])
+    return top.rename("count")
+
+
+def count_table(dataset, column):
+    return dataset.derived(("count_table", column), lambda: CountTable(sorted_index(dataset, column)))
+
+
+def _scan_top(dataset, column, threshold, k):
+    # Out-of-core datasets: frequent values of each record batch, merged
+    items = FrequentItems()
+    for _, frame in dataset.batches([column]):
+        series = frame[column]
+        items.update(series[(series > threshold).to_numpy(dtype=bool, na_value=False)])
+    return _top(items.counts, k, items.total)
+
+
+def top_categories(dataset, column, threshold, k=TOP_K):
+    if isinstance(dataset, ChunkedDataset):
+        return _scan_top(dataset, column, threshold, k)
+    if not is_indexable(dataset.column(column)):
+        return _top(filter_greater(dataset, column, threshold)[column].value_counts(), k)
+    return count_table(dataset, column).top_greater(threshold, k)
+
+
+def top_k_pie(ax, dataset, column, threshold, color, k=TOP_K):
+    # Pie of the k most frequent values above the threshold plus "Other"
+    counts = top_categories(dataset, column, threshold, k)
+    if not counts.sum():
+        ax.set_axis_off()
+        return ax.text(0.5, 0.5, f"No values of {column} above {threshold}", ha="center", va="center")
+    return ax.pie(counts, labels=counts.index, autopct="%1.1f%%", colors=[color])
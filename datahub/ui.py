@@ -0,0 +1,480 @@
+# Streamlit widgets built on top of the shared data layer.
+import inspect
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from datahub.config import CHART_POINTS, TABLE_PAGE_ROWS
+from datahub.dataset import Dataset
+from datahub.downsample import minmax_batches, reduce_series
+from datahub.export import FORMATS, available_formats
+from datahub.figures import render_png
+from datahub.index import filter_greater, sorted_index
+from datahub.ingest import load_dataset, load_lazy_dataset
+from datahub.jobs import DONE, FAILED, job_manager
+from datahub.lazy import LazyDataset
+from datahub.metrics import threshold_metrics
+from datahub.outofcore import ChunkedDataset
+from datahub.predicates import And, In, Or, Range
+from datahub.pyramid import level_pyramid
+from datahub.queries import cache_statistics, cached_query
+from datahub.sampling import SampleDataset, estimate_greater, sample_dataset
+from datahub.sketches import FrequentItems
+from datahub.summary import describe_all, describe_greater, describe_rows
+from datahub.table import display_order, selection_key
+from datahub.tasks import exact_summary, export_rows
+
+
+def load_with_preview(uploaded_file, preview_rows=10, lazy=False, **read_options):
+    # Show the first rows as soon as the first chunk is parsed, with a real
+    # progress bar for the rest of the upload.  Cached uploads skip straight
+    # to the preview.  With lazy=True only the header and a sample are read
+    # here; columns are parsed when the page first uses them.
+    if lazy:
+        dataset = load_lazy_dataset(uploaded_file, **read_options)
+        # May be a fully parsed dataset that another page already loaded
+        head = dataset.sample.head(preview_rows) if isinstance(dataset, LazyDataset) else _head(dataset, preview_rows)
+        st.dataframe(head)
+        memory_summary(dataset)
+        return dataset
+    preview = st.empty()
+    progress = st.empty()
+
+    def on_chunk(update):
+        if update.chunk == 0:
+            preview.dataframe(update.frame.head(preview_rows))
+        progress.progress(update.fraction, text=f"Parsed {update.rows:,} rows ({update.fraction:.0%} of upload)")
+
+    dataset = load_dataset(uploaded_file, on_chunk=on_chunk, **read_options)
+    progress.empty()
+    preview.dataframe(_head(dataset, preview_rows))
+    memory_summary(dataset)
+    return dataset
+
+
+def _head(dataset, rows):
+    # The first rows through take(), which reads just those rows of an
+    # out-of-core dataset instead of the whole table
+    return dataset.take(np.arange(min(rows, len(dataset))))
+
+
+def _megabytes(nbytes):
+    return f"{nbytes / 1024 ** 2:,.1f} MB"
+
+
+def memory_summary(dataset):
+    # Before/after footprint of the ingest-time dtype optimisation
+    report = dataset.ingest_report
+    if isinstance(dataset, LazyDataset):
+        loaded = len(dataset.loaded_columns)
+        st.caption(f"In memory: {_megabytes(dataset.nbytes)} ({loaded} of {len(dataset.columns)} columns parsed)")
+        return
+    if isinstance(dataset, ChunkedDataset):
+        st.caption(f"On disk: {_megabytes(dataset.table.nbytes)}, read one batch at a time")
+        return
+    if "memory_before" not in report:
+        st.caption(f"In memory: {_megabytes(dataset.nbytes)}")
+        return
+    before, after = report["memory_before"], report["memory_after"]
+    saved = 1 - after / before if before else 0.0
+    st.caption(f"In memory: {_megabytes(after)} (was {_megabytes(before)} as parsed, {saved:.0%} smaller)")
+
+
+_FORMAT_NAMES = {"csv": "CSV", "jsonl": "JSON Lines", "parquet": "Parquet", "feather": "Feather"}
+
+
+def ingest_summary(dataset):
+    # Replaces the old simulated "processing" progress loops
+    report = dataset.ingest_report
+    if not report:
+        return
+    if isinstance(dataset, LazyDataset):
+        where = "the on-disk cache" if report["source"] == "spill" else "the upload"
+        st.progress(1.0, text=f"Read {report['columns']} column names from {where} ({report['seconds']:.2f} s)")
+        return
+    if report.get("out_of_core"):
+        text = f"Wrote {report['rows']:,} rows to disk in {report['chunks']} chunk(s) ({report['seconds']:.2f} s)"
+        if report["dropped"]:
+            text += f"; {report['dropped']:,} non-numeric values in numeric columns stored as missing"
+        st.progress(1.0, text=text)
+        return
+    if report.get("source") == "spill":
+        st.progress(1.0, text=f"Loaded {report['rows']:,} rows from the on-disk cache ({report['seconds']:.2f} s)")
+        return
+    upload = _FORMAT_NAMES.get(report.get("format"), "CSV")
+    if report.get("compression"):
+        upload = f"{'+'.join(report['compression'])}-compressed {upload}"
+    if report.get("format", "csv") != "csv":
+        st.progress(1.0, text=f"Read {report['rows']:,} rows from {upload} ({report['seconds']:.2f} s)")
+        return
+    st.progress(1.0, text=f"Parsed {report['rows']:,} rows of {upload} in {report['chunks']} chunk(s) ({report['seconds']:.2f} s)")
+
+
+def fast_preview(dataset, key="fast_preview"):
+    # Sidebar switch to run the page on a sample of the rows: uniform, or
+    # stratified on a chosen column.  Returns the SampleDataset when it is
+    # on, the dataset itself otherwise.
+    if not st.sidebar.checkbox("Fast preview (sample)", key=key):
+        return dataset
+    strata = st.sidebar.selectbox("Stratify on", list(dataset.columns), index=None, placeholder="Uniform sample", key=f"{key}_strata")
+    sample = sample_dataset(dataset, strata)
+    st.sidebar.caption(f"Filters, charts and statistics use {len(sample):,} of {sample.population:,} rows.")
+    return sample
+
+
+def exact_refinement(sample, column, threshold, key="compute_exactly"):
+    # "Compute exactly" button for a page showing sample estimates; returns
+    # (metrics, describe()) over every row once the background job is done
+    # Keyed by the full dataset: every sample of it shares the result
+    job_key = ("exact_summary", sample.source.key, column, threshold)
+    if st.button("Compute exactly", key=key):
+        job_manager.submit(job_key, "Exact computation", exact_summary, sample.source, column, threshold)
+    job = job_manager.get(job_key)
+    if job is None:
+        return None
+    job_progress(job)
+    return job.result if job.status == DONE else None
+
+
+def threshold_metric_cards(dataset, column, threshold, key="compute_exactly"):
+    # Max, min and mean of the rows above the threshold; estimated with 95%
+    # margins on a SampleDataset, until the exact values are computed
+    if isinstance(dataset, SampleDataset):
+        exact = exact_refinement(dataset, column, threshold, key)
+        if exact is None:
+            estimate = cached_query(dataset, ("estimate", column, threshold), lambda: estimate_greater(dataset, column, threshold))
+            st.metric("Maximum Value", f"≥ {estimate.max:,.4g}")
+            st.metric("Minimum Value", f"≤ {estimate.min:,.4g}")
+            st.metric("Mean Value", f"{estimate.mean:,.2f} ± {estimate.mean_margin:,.2f}")
+            st.metric("Matching Rows", f"{estimate.count:,.0f} ± {estimate.count_margin:,.0f}")
+            st.caption(
+                f"Estimated from {estimate.sample_rows:,} matching rows of a {len(dataset):,}-row sample "
+                "(95% margins; max and min are those of the sample)."
+            )
+            return
+        metrics = exact[0]
+    else:
+        metrics = threshold_metrics(dataset, column, threshold)
+    st.metric("Maximum Value", metrics.max)
+    st.metric("Minimum Value", metrics.min)
+    st.metric("Mean Value", round(metrics.mean, 2))
+
+
+# describe() of an out-of-core dataset is one pass over its batches
+_SCANNED_QUANTILES = "Quantiles are approximate (about 1% rank error): the data is read from disk batch by batch."
+
+
+def dataset_summary(dataset, static=False):
+    # describe() of the whole dataset, computed once per dataset and shared
+    # by every session
+    show = st.table if static else st.write
+    show(cached_query(dataset, ("describe_all",), lambda: describe_all(dataset)))
+    if isinstance(dataset, ChunkedDataset):
+        st.caption(_SCANNED_QUANTILES)
+
+
+def selection_statistics(rows):
+    # describe() of exactly the rows of a RowView, for filters that are more
+    # than one "column > threshold"
+    dataset = rows.dataset
+    query = ("describe_rows", selection_key(rows.positions, rows.key))
+    st.write(cached_query(dataset, query, lambda: describe_rows(rows)))
+    if isinstance(dataset, ChunkedDataset):
+        st.caption(_SCANNED_QUANTILES)
+
+
+def summary_statistics(dataset, column, threshold, key="exact_summary"):
+    # describe() of the filtered rows from prebuilt block summaries, with the
+    # full pandas computation one click away
+    if isinstance(dataset, SampleDataset):
+        exact = exact_refinement(dataset, column, threshold, f"{key}_refine")
+        if exact is not None:
+            st.write(exact[1])
+            return
+        st.write(cached_query(dataset, ("describe", column, threshold, False), lambda: describe_greater(dataset, column, threshold)))
+        caption = f"Computed on a sample of {len(dataset):,} of {dataset.population:,} rows; counts are of the sample"
+        if dataset.strata_column is not None:
+            caption += f", and small groups of `{dataset.strata_column}` are over-represented"
+        st.caption(caption + ".")
+        return
+    if isinstance(dataset, ChunkedDataset):
+        # One pass over the batches; exact quantiles would need every row
+        st.write(cached_query(dataset, ("describe", column, threshold, False), lambda: describe_greater(dataset, column, threshold)))
+        st.caption(_SCANNED_QUANTILES)
+        return
+    exact = st.checkbox("Exact quantiles", key=key)
+    query = ("describe", column, threshold, exact)
+    st.write(cached_query(dataset, query, lambda: describe_greater(dataset, column, threshold, exact=exact)))
+    if not exact:
+        st.caption(f"Quantiles of columns other than `{column}` are approximate (about 1% rank error).")
+
+
+# Streamlit can only report whether an expander is open if it reruns the app
+# when the expander is toggled; older releases always run the body
+_EXPANDER_TRACKS_STATE = "on_change" in inspect.signature(st.expander).parameters
+
+
+@contextmanager
+def deferred_expander(label, key=None, expanded=False):
+    # Like st.expander, but yields whether the body should be computed, so
+    # expensive content is skipped while the section is collapsed
+    if _EXPANDER_TRACKS_STATE:
+        section = st.expander(label, expanded=expanded, key=key or f"expander_{label}", on_change="rerun")
+    else:
+        section = st.expander(label, expanded=expanded)
+    with section:
+        yield getattr(section, "open", None) is not False
+
+
+def _render_job(job):
+    if job.status == FAILED:
+        st.error(f"{job.name} failed: {job.error}")
+    elif job.done:
+        st.progress(1.0, text=f"{job.name} finished in {job.elapsed:.1f} s. {job.message}")
+    else:
+        st.progress(job.progress, text=f"{job.name}: {job.message or job.status}")
+
+
+def job_progress(job, poll_seconds=0.5):
+    # Show a background job's progress without blocking the script.  While
+    # the job runs only this fragment reruns; once it finishes the whole app
+    # reruns so that anything depending on the result can render.
+    if job.done or not hasattr(st, "fragment"):
+        _render_job(job)
+        if not job.done:
+            st.button("Refresh status", key=f"refresh_job_{job.id}")
+        return
+
+    @st.fragment(run_every=poll_seconds)
+    def poll():
+        _render_job(job)
+        if job.done:
+            st.rerun()
+
+    poll()
+
+
+# Chart kind -> (Streamlit chart function name, reduction method)
+_CHARTS = {
+    "line": ("line_chart", "lttb"),
+    "area": ("area_chart", "lttb"),
+    "bar": ("bar_chart", "minmax"),
+    "scatter": ("scatter_chart", "minmax"),
+}
+_METHOD_NAMES = {"lttb": "largest-triangle-three-buckets", "minmax": "min/max per bucket"}
+
+
+def chart_point_budget():
+    return st.sidebar.number_input("Chart point budget", min_value=100, max_value=1_000_000, value=CHART_POINTS, step=500)
+
+
+def reduced_chart(kind, data, budget=CHART_POINTS, **chart_options):
+    # Draw a Streamlit chart with at most `budget` points, saying whether
+    # the picture is exact or reduced
+    chart_name, method = _CHARTS[kind]
+    draw = getattr(st, chart_name)
+    if isinstance(data, pd.DataFrame):
+        _reduced_frame_chart(draw, method, data, budget, **chart_options)
+        return
+    if not pd.api.types.is_numeric_dtype(data):
+        draw(data, **chart_options)
+        return
+    reduced, exact = reduce_series(data, budget, method)
+    draw(reduced, **chart_options)
+    if exact:
+        st.caption(f"Exact: all {len(reduced):,} points shown.")
+    else:
+        st.caption(f"Reduced: {len(reduced):,} of {data.count():,} points shown ({_METHOD_NAMES[method]}).")
+
+
+def _reduced_frame_chart(draw, method, frame, budget, **chart_options):
+    # Only numeric columns can be charted; each is reduced to its share of
+    # the budget and the rows picked for any of them are drawn
+    numeric = frame.select_dtypes("number")
+    if numeric.columns.empty:
+        st.info("No numeric columns to chart.")
+        return
+    share = max(budget // len(numeric.columns), 3)
+    picked = [reduce_series(numeric[name], share, method) for name in numeric.columns]
+    rows = numeric.index[numeric.index.isin(pd.Index([]).append([reduced.index for reduced, _ in picked]))]
+    draw(numeric.loc[rows], **chart_options)
+    if all(exact for _, exact in picked):
+        st.caption(f"Exact: all {len(rows):,} rows shown.")
+    else:
+        st.caption(f"Reduced: {len(rows):,} of {len(numeric):,} rows shown ({_METHOD_NAMES[method]} per column).")
+
+
+def overview_chart(kind, dataset, budget=CHART_POINTS, **chart_options):
+    # Every numeric column of a dataset, reduced to the point budget; out-of-
+    # core datasets are reduced min/max per bucket while reading from disk
+    columns = [name for name in dataset.columns if dataset.is_numeric(name)]
+    if not isinstance(dataset, ChunkedDataset) or not columns:
+        reduced_chart(kind, pd.concat({name: dataset.column(name) for name in columns}, axis=1) if columns else pd.DataFrame(), budget, **chart_options)
+        return
+    share = max(budget // len(columns), 2)
+    rows = pd.RangeIndex(len(dataset))
+    frame = pd.concat({
+        name: minmax_batches(((offset, batch[name]) for offset, batch in dataset.batches([name])), rows, share)
+        for name in columns
+    }, axis=1)
+    getattr(st, _CHARTS[kind][0])(frame, **chart_options)
+    st.caption(f"Reduced: {len(frame):,} of {len(dataset):,} rows shown ({_METHOD_NAMES['minmax']} per column, read from disk).")
+
+
+def selection_chart(kind, rows, column, budget=CHART_POINTS, **chart_options):
+    # reduced_chart() of one column of a RowView or a whole Dataset.  For
+    # out-of-core datasets the selected rows are reduced min/max per bucket
+    # while the column is read from disk, instead of being gathered first.
+    if isinstance(rows, Dataset):
+        dataset, positions = rows, pd.RangeIndex(len(rows))
+    else:
+        dataset, positions = rows.dataset, rows.positions
+    if not isinstance(dataset, ChunkedDataset) or not dataset.is_numeric(column) or len(rows) <= budget:
+        reduced_chart(kind, rows.column(column), budget, **chart_options)
+        return
+    batches = ((offset, frame[column]) for offset, frame in dataset.batches([column]))
+    reduced = minmax_batches(batches, positions, budget).rename(column)
+    getattr(st, _CHARTS[kind][0])(reduced, **chart_options)
+    st.caption(f"Reduced: {len(reduced):,} of {len(rows):,} rows shown ({_METHOD_NAMES['minmax']}, read from disk).")
+
+
+def zoom_window(dataset, key=None):
+    # Row range slider for pyramid charts; the full range when there is
+    # nothing to zoom into
+    if len(dataset) < 2:
+        return 0, len(dataset)
+    return st.slider("Zoom to rows", 0, len(dataset), (0, len(dataset)), key=key)
+
+
+def pyramid_chart(kind, dataset, column, threshold, budget=CHART_POINTS, window=None, **chart_options):
+    # Chart the rows of `column` above `threshold` inside a row window from
+    # the column's level-of-detail pyramid: exact rows when they fit the
+    # budget, per-bucket envelopes otherwise.  Moving the threshold or the
+    # window only reads the pyramid, never the raw rows.
+    if not dataset.is_numeric(column):
+        reduced_chart(kind, filter_greater(dataset, column, threshold)[column], budget, **chart_options)
+        return
+    start, stop = window or (0, len(dataset))
+    frame, level = level_pyramid(dataset, column).view(start, stop, threshold, budget)
+    frame.index = dataset.index[frame.index]
+    if level == 0:
+        frame.columns = [column]
+    elif kind == "bar":
+        frame = frame[["max"]]
+    draw = getattr(st, _CHARTS[kind][0])
+    draw(frame, **chart_options)
+    if level == 0:
+        st.caption(f"Exact: all {len(frame):,} points shown.")
+    else:
+        summary = "/".join(frame.columns)
+        st.caption(f"Level {level}: {summary} of every {1 << level:,} rows, {len(frame):,} buckets shown.")
+
+
+def chart_image(kind, dataset, column, threshold, color, draw):
+    # Show a matplotlib chart drawn by draw(ax), rasterised once per
+    # (dataset, column, threshold, chart type, color)
+    png = render_png((dataset.key, column, threshold, kind, color), draw)
+    st.image(png, width="stretch")
+
+
+def paged_table(rows, key, page_rows=TABLE_PAGE_ROWS, static=False):
+    # Show one page of a Dataset or RowView, sorted and positioned on the
+    # server; only the visible rows are sent to the browser
+    if isinstance(rows, Dataset):
+        dataset, positions, selection = rows, None, None
+    else:
+        dataset, positions, selection = rows.dataset, rows.positions, rows.key
+    show = st.table if static else st.dataframe
+    total = len(rows)
+    if dataset is None or not total:
+        show(pd.DataFrame(columns=rows.columns))
+        return
+    sort_column, direction, jump = st.columns(3)
+    # Sorting needs a whole column in memory, which out-of-core datasets avoid
+    column = sort_column.selectbox(
+        "Sort by", list(dataset.columns), index=None, placeholder="Row order", key=f"{key}_sort",
+        disabled=isinstance(dataset, ChunkedDataset),
+    )
+    descending = direction.checkbox("Descending", key=f"{key}_descending")
+    start = jump.number_input("Jump to row", min_value=0, value=0, step=page_rows, key=f"{key}_start")
+    start = min(int(start), (total - 1) // page_rows * page_rows)
+    order = display_order(dataset, positions, column, descending, selection)
+    stop = min(start + page_rows, total)
+    page = np.arange(start, stop) if order is None else order[start:stop]
+    show(dataset.take(page))
+    st.caption(f"Rows {start + 1:,}-{stop:,} of {total:,}")
+
+
+def export_download(rows, key, label="Download", file_stem="filtered_data"):
+    # Format picker plus a download button whose file is only serialised
+    # (as a background job, shared by every session asking for the same
+    # rows and format) once somebody asks for it
+    format_name = st.selectbox("Export format", available_formats(), key=f"{key}_format")
+    extension, mime, _, _ = FORMATS[format_name]
+    job_key = ("export", rows.dataset.key, selection_key(rows.positions, rows.key), format_name)
+    if st.button("Prepare download", key=f"{key}_prepare"):
+        job_manager.submit(job_key, "Data export", export_rows, rows, format_name)
+    job = job_manager.get(job_key)
+    if job is not None:
+        job_progress(job)
+        if job.status == DONE:
+            st.download_button(label, data=job.result, file_name=f"{file_stem}.{extension}", mime=mime, key=f"{key}_download")
+
+
+# Most frequent values offered for a text column in the filter builder
+FILTER_CHOICES = 1000
+
+
+def _filter_choices(dataset, column):
+    if isinstance(dataset, ChunkedDataset):
+        items = FrequentItems(FILTER_CHOICES)
+        for _, frame in dataset.batches([column]):
+            items.update(frame[column])
+        return list(items.counts.sort_values(ascending=False, kind="stable").index)
+    return list(dataset.column(column).value_counts().index[:FILTER_CHOICES])
+
+
+def _column_range(dataset, column):
+    if isinstance(dataset, ChunkedDataset):
+        metrics = threshold_metrics(dataset, column, -np.inf)
+        return float(metrics.min), float(metrics.max)
+    values = sorted_index(dataset, column).sorted_values
+    if not len(values):
+        return np.nan, np.nan
+    return values[0].item(), values[-1].item()
+
+
+def predicate_builder(dataset, key="predicate"):
+    # Pick columns, then a range (numeric) or a set of values (text) for
+    # each, and whether rows must match all or any of them.  Returns the
+    # predicate, or None while nothing is restricted.
+    columns = st.multiselect("Filter on columns", list(dataset.columns), key=f"{key}_columns")
+    conditions = []
+    for column in columns:
+        if dataset.is_numeric(column):
+            low, high = _column_range(dataset, column)
+            if not low < high:
+                continue
+            chosen = st.slider(f"`{column}` between", low, high, (low, high), key=f"{key}_{column}_{low}_{high}")
+            if chosen != (low, high):
+                conditions.append(Range(column, chosen[0], chosen[1], low_inclusive=True, high_inclusive=True))
+        else:
+            options = dataset.derived(("filter_choices", column), lambda: _filter_choices(dataset, column))
+            chosen = st.multiselect(f"`{column}` is one of", options, key=f"{key}_{column}")
+            if chosen:
+                conditions.append(In(column, chosen))
+    if not conditions:
+        return None
+    mode = st.radio("Rows must match", ["All conditions", "Any condition"], horizontal=True, key=f"{key}_mode")
+    return And(*conditions) if mode == "All conditions" else Or(*conditions)
+
+
+def cache_panel():
+    # Sidebar table of the process-wide caches: size, hits and hit rate
+    with st.sidebar.expander("Cache statistics"):
+        stats = pd.DataFrame(cache_statistics()).T
+        stats["MB"] = stats.pop("bytes") / 1024 ** 2
+        stats["budget MB"] = stats.pop("max_bytes") / 1024 ** 2
+        st.dataframe(stats.round({"MB": 1, "budget MB": 0, "hit_rate": 3}))
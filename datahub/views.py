@@ -0,0 +1,80 @@
+# Filter results kept as row selections over a shared Dataset.
+#
+# Sessions used to store a fully materialised copy of their filtered rows in
+# st.session_state.  A RowView only remembers which rows were selected: as
+# positions when the selection is sparse, or as a bitmap when a packed bit
+# per row is smaller.  Rows are only copied out when a consumer asks.
+import numpy as np
+import pandas as pd
+
+
+class RowView:
+    def __init__(self, dataset, positions, key=None):
+        self.dataset = dataset
+        # The filter that selected these rows, when known; equal keys on the
+        # same dataset mean equal selections
+        self.key = key
+        self._count = len(positions)
+        total = len(dataset) if dataset is not None else 0
+        if self._count * 4 > total / 8:
+            bits = np.zeros(total, dtype=bool)
+            bits[positions] = True
+            self._bits = np.packbits(bits)
+            self._positions = None
+        else:
+            dtype = np.int32 if total < 2 ** 31 else np.int64
+            self._positions = np.sort(np.asarray(positions, dtype=dtype))
+            self._bits = None
+
+    @classmethod
+    def empty_view(cls):
+        return cls(None, np.empty(0, dtype=np.int64))
+
+    def bound_to(self, dataset):
+        # The same selection over `dataset`, which must hold the same rows;
+        # shares the positions or bitmap.  Views kept in process-wide caches
+        # are bound to None so that they do not keep a frame alive.
+        view = RowView.__new__(RowView)
+        view.__dict__.update(self.__dict__)
+        view.dataset = dataset
+        return view
+
+    @property
+    def nbytes(self):
+        return (self._bits if self._bits is not None else self._positions).nbytes
+
+    @property
+    def positions(self):
+        if self._bits is None:
+            return self._positions
+        return np.flatnonzero(np.unpackbits(self._bits, count=len(self.dataset)))
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def empty(self):
+        return self._count == 0
+
+    @property
+    def columns(self):
+        return self.dataset.columns if self.dataset is not None else pd.Index([])
+
+    @property
+    def index(self):
+        if self.dataset is None:
+            return pd.RangeIndex(0)
+        return self.dataset.index[self.positions]
+
+    def column(self, name):
+        # Materialise a single column of the selected rows
+        if self.dataset is None:
+            raise KeyError(name)
+        return self.dataset.column_at(name, self.positions)
+
+    def frame(self):
+        # Materialise every column of the selected rows
+        if self.dataset is None:
+            return pd.DataFrame()
+        return self.dataset.take(self.positions)
+
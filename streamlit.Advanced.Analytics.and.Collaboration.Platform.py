@@ -2,8 +2,11 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import time
+
+from datahub import select_greater, threshold_metrics, upload_types
+from datahub.density import density_scatter
+from datahub.topk import top_k_pie
+from datahub.ui import chart_image, chart_point_budget, deferred_expander, export_download, ingest_summary, load_with_preview, paged_table, selection_chart, summary_statistics
 
 # App Title and Header
 st.title("DataSphere: Advanced Analytics & Collaboration Platform")
@@ -11,7 +14,8 @@ st.header("Explore, Visualize, Collaborate, and Analyze Data Efficiently")
 
 # Sidebar Configuration: File Upload & Settings
 st.sidebar.header("Data Upload and Settings")
-uploaded_file = st.sidebar.file_uploader("Upload a CSV file", type=["csv"])
+uploaded_file = st.sidebar.file_uploader("Upload a CSV file", type=upload_types())
+point_budget = chart_point_budget()
 
 # Sidebar for visualization options
 chart_type = st.sidebar.radio("Choose Chart Type", ["Line Chart", "Bar Chart", "Scatter Plot", "Pie Chart", "Area Chart"])
@@ -40,54 +44,46 @@ st.header("Dataset Overview and Analytics")
 
 # If file uploaded
 if uploaded_file:
-    # Reading the data and displaying the first few rows
-    data = pd.read_csv(uploaded_file)
+    # Reading the data, displaying the first few rows as soon as they parse
     st.write("### Raw Data Preview")
-    st.dataframe(data.head(10))
+    dataset = load_with_preview(uploaded_file, preview_rows=10)
 
     # Filtering data based on user input
-    if filter_column and filter_column in data.columns:
-        filtered_data = data[data[filter_column] > value_filter]
+    if filter_column and filter_column in dataset.columns:
+        filtered_rows = select_greater(dataset, filter_column, value_filter)
         st.write(f"Filtered Data (where `{filter_column}` > {value_filter})")
-        st.dataframe(filtered_data)
+        paged_table(filtered_rows, "filtered_table")
 
         # Data Summary Statistics
-        with st.expander("Show Summary Statistics"):
-            st.write(filtered_data.describe())
+        with deferred_expander("Show Summary Statistics") as is_open:
+            if is_open:
+                summary_statistics(dataset, filter_column, value_filter)
 
         # Chart Visualization
         st.subheader(f"{chart_type} of `{filter_column}`")
         if chart_type == "Line Chart":
-            st.line_chart(filtered_data[filter_column])
+            selection_chart("line", filtered_rows, filter_column, point_budget)
         elif chart_type == "Bar Chart":
-            st.bar_chart(filtered_data[filter_column])
+            selection_chart("bar", filtered_rows, filter_column, point_budget)
         elif chart_type == "Scatter Plot":
-            fig, ax = plt.subplots()
-            ax.scatter(filtered_data.index, filtered_data[filter_column], color=chart_color)
-            st.pyplot(fig)
+            chart_image("scatter", dataset, filter_column, value_filter, chart_color, lambda ax: density_scatter(ax, filtered_rows.index, filtered_rows.column(filter_column), chart_color))
         elif chart_type == "Pie Chart":
-            pie_data = filtered_data[filter_column].value_counts()
-            fig, ax = plt.subplots()
-            ax.pie(pie_data, labels=pie_data.index, autopct='%1.1f%%', colors=[chart_color])
-            st.pyplot(fig)
+            chart_image("pie", dataset, filter_column, value_filter, chart_color, lambda ax: top_k_pie(ax, dataset, filter_column, value_filter, chart_color))
         elif chart_type == "Area Chart":
-            st.area_chart(filtered_data[filter_column])
+            selection_chart("area", filtered_rows, filter_column, point_budget)
 
         # Download filtered data
         st.subheader("Download Filtered Data")
-        csv = filtered_data.to_csv(index=False)
-        st.download_button("Download CSV", data=csv, file_name="filtered_data.csv", mime="text/csv")
+        export_download(filtered_rows, "download", "Download")
 
     else:
         st.warning(f"Column `{filter_column}` not found in the dataset!")
 
-# Simulating progress for large dataset analysis
+# Parse progress for large dataset analysis
 st.header("Processing Large Datasets")
-with st.spinner("Analyzing your data..."):
-    for i in range(100):
-        time.sleep(0.02)
-        st.progress(i + 1)
-st.success("Data analysis completed!")
+if uploaded_file:
+    ingest_summary(dataset)
+    st.success("Data analysis completed!")
 
 # Collaborative Mode: Chat and Feedback
 if collaboration_mode:
@@ -95,9 +91,10 @@ if collaboration_mode:
     chat_message = st.chat_input("Send a message to your team")
     if chat_message:
         st.write(f"You: {chat_message}")
-    with st.expander("Chat History"):
-        st.chat_message("User1").write("User1: Let's focus on the outliers.")
-        st.chat_message("User2").write("User2: Agreed, let's clean the data and rerun the analysis.")
+    with deferred_expander("Chat History") as is_open:
+        if is_open:
+            st.chat_message("User1").write("User1: Let's focus on the outliers.")
+            st.chat_message("User2").write("User2: Agreed, let's clean the data and rerun the analysis.")
 
 # Feedback Mode
 if feedback_mode:
@@ -113,9 +110,10 @@ if feedback_mode:
 # Key Metrics Display
 st.header("Key Metrics")
 if uploaded_file and filter_column:
-    st.metric("Max Value", filtered_data[filter_column].max())
-    st.metric("Min Value", filtered_data[filter_column].min())
-    st.metric("Mean Value", round(filtered_data[filter_column].mean(), 2))
+    metrics = threshold_metrics(dataset, filter_column, value_filter)
+    st.metric("Max Value", metrics.max)
+    st.metric("Min Value", metrics.min)
+    st.metric("Mean Value", round(metrics.mean, 2))
 
 # LaTeX Formula for advanced analysis
 st.latex(r"\int_a^b f(x)dx = F(b) - F(a)")
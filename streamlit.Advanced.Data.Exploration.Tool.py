@@ -2,82 +2,82 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import time
+
+from datahub import RowView, select_greater, threshold_metrics, upload_types
+from datahub.density import density_scatter
+from datahub.histogram import threshold_histogram
+from datahub.jobs import job_manager
+from datahub.tasks import prepare_dataset
+from datahub.ui import chart_image, chart_point_budget, deferred_expander, export_download, ingest_summary, job_progress, load_with_preview, paged_table, selection_chart, summary_statistics
 
 # Title of the App
 st.title("InsightPro: Advanced Data Exploration Tool")
 
 # Sidebar for file upload and user settings
 st.sidebar.header("Upload Dataset and Configure Settings")
-uploaded_file = st.sidebar.file_uploader("Upload a CSV file", type=["csv"])
+uploaded_file = st.sidebar.file_uploader("Upload a CSV file", type=upload_types())
+point_budget = chart_point_budget()
 
 # Sidebar for visualization options
 chart_type = st.sidebar.radio("Choose Chart Type", ["Line Chart", "Bar Chart", "Scatter Plot", "Histogram"])
 selected_color = st.sidebar.color_picker("Pick a Chart Color", "#FF5733")
 value_filter = st.sidebar.slider("Filter data values", 0, 100, 25)
 
-# Session State for Storing Filtered Data
-if 'filtered_data' not in st.session_state:
-    st.session_state['filtered_data'] = pd.DataFrame()
+# Session State for Storing Filtered Rows (positions over the shared dataset, not a copy)
+if 'filtered_rows' not in st.session_state:
+    st.session_state['filtered_rows'] = RowView.empty_view()
 
 # Main App Section: Data Handling and Visualization
 st.header("Data Overview & Visualization")
 
 # If file is uploaded
 if uploaded_file:
-    data = pd.read_csv(uploaded_file)
     st.write("### Raw Data Preview")
-    st.dataframe(data.head(10))
+    dataset = load_with_preview(uploaded_file, preview_rows=10)
 
     # Filter Column Selection
     st.sidebar.subheader("Filter Data")
-    filter_column = st.sidebar.selectbox("Select column to filter", data.columns)
+    filter_column = st.sidebar.selectbox("Select column to filter", dataset.columns)
 
     # Filter data based on slider value
-    filtered_data = data[data[filter_column] > value_filter]
-    st.session_state['filtered_data'] = filtered_data
+    filtered_rows = select_greater(dataset, filter_column, value_filter)
+    st.session_state['filtered_rows'] = filtered_rows
 
     st.write(f"### Filtered Data (by `{filter_column} > {value_filter}`)")
-    st.dataframe(filtered_data)
+    paged_table(filtered_rows, "filtered_table")
 
     # Chart Visualization
     st.subheader(f"{chart_type} for `{filter_column}`")
     if chart_type == "Line Chart":
-        st.line_chart(filtered_data[filter_column])
+        selection_chart("line", filtered_rows, filter_column, point_budget)
     elif chart_type == "Bar Chart":
-        st.bar_chart(filtered_data[filter_column])
+        selection_chart("bar", filtered_rows, filter_column, point_budget)
     elif chart_type == "Scatter Plot":
-        fig, ax = plt.subplots()
-        ax.scatter(filtered_data.index, filtered_data[filter_column], color=selected_color)
-        st.pyplot(fig)
+        chart_image("scatter", dataset, filter_column, value_filter, selected_color, lambda ax: density_scatter(ax, filtered_rows.index, filtered_rows.column(filter_column), selected_color))
     elif chart_type == "Histogram":
-        fig, ax = plt.subplots()
-        ax.hist(filtered_data[filter_column], bins=20, color=selected_color)
-        st.pyplot(fig)
+        chart_image("histogram", dataset, filter_column, value_filter, selected_color, lambda ax: threshold_histogram(ax, dataset, filter_column, value_filter, selected_color))
 
     # Data Summary
-    with st.expander("Summary Statistics"):
-        st.write(filtered_data.describe())
+    with deferred_expander("Summary Statistics") as is_open:
+        if is_open:
+            summary_statistics(dataset, filter_column, value_filter)
 
     # Data Download
     st.subheader("Download Filtered Data")
-    csv = filtered_data.to_csv(index=False)
-    st.download_button("Download Filtered Data", data=csv, file_name="filtered_data.csv", mime="text/csv")
+    export_download(filtered_rows, "download", "Download Filtered Data")
 
-# Progress Bar Example
-st.header("Simulated Data Processing Progress")
-progress_bar = st.progress(0)
-for i in range(100):
-    time.sleep(0.02)
-    progress_bar.progress(i + 1)
+# Progress of parsing the uploaded dataset
+st.header("Data Processing Progress")
+if uploaded_file:
+    ingest_summary(dataset)
 
 # Metrics Section
 st.header("Key Metrics from Data")
 if uploaded_file:
-    st.metric("Max Value", filtered_data[filter_column].max())
-    st.metric("Min Value", filtered_data[filter_column].min())
-    st.metric("Mean Value", round(filtered_data[filter_column].mean(), 2))
+    metrics = threshold_metrics(dataset, filter_column, value_filter)
+    st.metric("Max Value", metrics.max)
+    st.metric("Min Value", metrics.min)
+    st.metric("Mean Value", round(metrics.mean, 2))
 
 # Feedback Section
 st.subheader("Feedback Section")
@@ -94,18 +94,22 @@ st.header("Team Collaboration Chat")
 chat_message = st.chat_input("Send a message to your team")
 if chat_message:
     st.write(f"You: {chat_message}")
-    with st.expander("Chat History"):
-        st.chat_message("team_member_1").write("Team Member 1: Let's analyze this dataset further.")
-        st.chat_message("team_member_2").write("Team Member 2: Agreed! This looks promising.")
+    with deferred_expander("Chat History") as is_open:
+        if is_open:
+            st.chat_message("team_member_1").write("Team Member 1: Let's analyze this dataset further.")
+            st.chat_message("team_member_2").write("Team Member 2: Agreed! This looks promising.")
 
 # LaTeX Formula Example
 st.latex(r"\sum_{i=1}^{n} x_i = X")
 
-# Task Simulation with Spinner
-st.header("Long Running Task Simulation")
-with st.spinner("Simulating a long running task..."):
-    time.sleep(3)
-st.success("Task completed successfully!")
+# Long Running Task: indexing the dataset in the background
+st.header("Long Running Task")
+if uploaded_file:
+    # Index only what this page's filter column and chart read
+    chart = {"Histogram": "histogram"}.get(chart_type)
+    job_progress(job_manager.submit(("prepare", dataset.key, filter_column, chart), "Dataset indexing", prepare_dataset, dataset, filter_column, chart))
+else:
+    st.info("Upload a dataset to run the indexing task.")
 
 # Footer Section
 st.markdown("---")
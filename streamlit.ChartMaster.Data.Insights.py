@@ -2,12 +2,16 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 
+from datahub import load_dataset, select_greater, threshold_metrics, upload_types
+from datahub.ui import chart_point_budget, paged_table, selection_chart, summary_statistics
+
 # Title
 st.title("Interactive Data Dashboard")
 
 # Sidebar for file upload and chart options
 st.sidebar.header("User Input")
-uploaded_file = st.sidebar.file_uploader("Upload your CSV", type=["csv"])
+uploaded_file = st.sidebar.file_uploader("Upload your CSV", type=upload_types())
+point_budget = chart_point_budget()
 chart_type = st.sidebar.radio("Select Chart Type", ["Line Chart", "Bar Chart", "Scatter Plot"])
 
 # Slider to filter data
@@ -21,35 +25,36 @@ show_additional = st.sidebar.checkbox("Show additional data")
 
 # Display DataFrame when file is uploaded
 if uploaded_file:
-    data = pd.read_csv(uploaded_file)
+    dataset = load_dataset(uploaded_file)
     st.write("Data Preview")
-    st.dataframe(data)
+    paged_table(dataset, "data_table")
 
     # Selectbox to choose column for visualization
-    column = st.selectbox("Choose a column to visualize", data.columns)
+    column = st.selectbox("Choose a column to visualize", dataset.columns)
 
     # Filter data based on slider
-    filtered_data = data[data[column] > filter_value]
+    filtered_rows = select_greater(dataset, column, filter_value)
 
     # Display the filtered data
     st.write(f"Data filtered by {column} > {filter_value}")
-    st.table(filtered_data)
+    paged_table(filtered_rows, "filtered_table", static=True)
 
     # Display chosen chart type
     if chart_type == "Line Chart":
-        st.line_chart(filtered_data[column])
+        selection_chart("line", filtered_rows, column, point_budget)
     elif chart_type == "Bar Chart":
-        st.bar_chart(filtered_data[column])
+        selection_chart("bar", filtered_rows, column, point_budget)
     else:
-        st.scatter_chart(filtered_data[column])
+        selection_chart("scatter", filtered_rows, column, point_budget)
 
     # Display progress bar
-    st.progress(int(filtered_data[column].mean()))
+    metrics = threshold_metrics(dataset, column, filter_value)
+    st.progress(int(metrics.mean))
 
     # Show additional data if checkbox is checked
     if show_additional:
         st.write("Additional Data Information:")
-        st.write(filtered_data.describe())
+        summary_statistics(dataset, column, filter_value)
 
     # Show success message on analysis
     if st.button("Complete Analysis"):
@@ -3,11 +3,15 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 
+from datahub import And, Range, evaluate, load_dataset, selection_metrics, threshold_metrics, upload_types
+from datahub.ui import chart_point_budget, deferred_expander, paged_table, predicate_builder, selection_chart, selection_statistics, summary_statistics
+
 # App Title
 st.title("Interactive Data Filtering and Visualization")
 
 # Sidebar for uploading files
-uploaded_file = st.sidebar.file_uploader("Upload your CSV", type=["csv"])
+uploaded_file = st.sidebar.file_uploader("Upload your CSV", type=upload_types())
+point_budget = chart_point_budget()
 
 # Sidebar for chart selection and value filter
 chart_type = st.sidebar.radio("Select Chart Type", ["Line Chart", "Bar Chart", "Area Chart"])
@@ -21,35 +25,49 @@ st.header("Dataset Overview")
 
 # If file is uploaded
 if uploaded_file:
-    data = pd.read_csv(uploaded_file)
+    dataset = load_dataset(uploaded_file)
 
     # Show data
     st.write("Here is the dataset you uploaded:")
-    st.dataframe(data)
+    paged_table(dataset, "data_table")
 
     # Filter data based on slider value
-    selected_column = st.selectbox("Select a column to filter and visualize", data.columns)
-    filtered_data = data[data[selected_column] > filter_value]
+    selected_column = st.selectbox("Select a column to filter and visualize", dataset.columns)
+    condition = Range(selected_column, filter_value)
+
+    # Optional conditions on other columns, applied on top of the slider
+    with st.expander("Advanced filter"):
+        predicate = predicate_builder(dataset)
+    if predicate is not None:
+        condition = And(condition, predicate)
+    filtered_rows = evaluate(dataset, condition)
 
-    st.write(f"Filtered data where `{selected_column}` > {filter_value}")
-    st.dataframe(filtered_data)
+    st.write(f"Filtered data where {condition}")
+    paged_table(filtered_rows, "filtered_table")
 
     # Display chart based on the user's selection
     st.subheader(f"{chart_type} for {selected_column}")
     if chart_type == "Line Chart":
-        st.line_chart(filtered_data[selected_column])
+        selection_chart("line", filtered_rows, selected_column, point_budget)
     elif chart_type == "Bar Chart":
-        st.bar_chart(filtered_data[selected_column])
+        selection_chart("bar", filtered_rows, selected_column, point_budget)
     else:
-        st.area_chart(filtered_data[selected_column])
+        selection_chart("area", filtered_rows, selected_column, point_budget)
 
-    # Metrics and progress
-    st.metric(label="Maximum Value", value=f"{filtered_data[selected_column].max()}")
-    st.progress(int(filtered_data[selected_column].mean()))
+    # Metrics and progress, of the same rows as the table and chart
+    if predicate is None:
+        metrics = threshold_metrics(dataset, selected_column, filter_value)
+    else:
+        metrics = selection_metrics(filtered_rows, selected_column)
+    st.metric(label="Maximum Value", value=f"{metrics.max}")
+    st.progress(int(metrics.mean))
 
     # Expander for summary statistics
-    with st.expander("Show Summary Statistics"):
-        st.write(filtered_data.describe())
+    with deferred_expander("Show Summary Statistics") as is_open:
+        if is_open and predicate is None:
+            summary_statistics(dataset, selected_column, filter_value)
+        elif is_open:
+            selection_statistics(filtered_rows)
 
     # Success button with balloons
     if st.button("Complete Analysis"):
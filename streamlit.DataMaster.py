@@ -2,15 +2,23 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import time
+
+from datahub import select_greater, threshold_metrics, upload_types
+from datahub.density import density_scatter
+from datahub.histogram import threshold_histogram
+from datahub.jobs import job_manager
+from datahub.tasks import prepare_dataset
+from datahub.topk import top_k_pie
+from datahub.ui import cache_panel, chart_image, chart_point_budget, deferred_expander, export_download, job_progress, load_with_preview, paged_table, selection_chart, summary_statistics
 
 # Set App Title
 st.title("DataMaster 360: Collaborative Analytics Platform")
 
 # Sidebar: User Settings and File Upload
 st.sidebar.header("Settings & File Upload")
-uploaded_file = st.sidebar.file_uploader("Upload your dataset (CSV)", type=["csv"])
+uploaded_file = st.sidebar.file_uploader("Upload your dataset (CSV)", type=upload_types())
+point_budget = chart_point_budget()
+cache_panel()
 
 # User Authentication
 st.sidebar.subheader("Login")
@@ -50,42 +58,35 @@ st.header("Data Overview & Visualization")
 
 # If file uploaded and user authenticated
 if uploaded_file:
-    data = pd.read_csv(uploaded_file)
     st.write("### Raw Data Preview")
-    st.dataframe(data.head(10))
+    dataset = load_with_preview(uploaded_file, preview_rows=10)
 
     # Filter Column Validation
-    if filter_column and filter_column in data.columns:
-        filtered_data = data[data[filter_column] > filter_value]
+    if filter_column and filter_column in dataset.columns:
+        filtered_rows = select_greater(dataset, filter_column, filter_value)
         st.write(f"### Filtered Data (by `{filter_column} > {filter_value}`)")
-        st.dataframe(filtered_data)
+        paged_table(filtered_rows, "filtered_table")
 
         # Show Summary Statistics
-        with st.expander("Summary Statistics"):
-            st.write(filtered_data.describe())
+        with deferred_expander("Summary Statistics") as is_open:
+            if is_open:
+                summary_statistics(dataset, filter_column, filter_value)
 
         # Chart Rendering
         st.subheader(f"Visualization: {chart_type}")
         if chart_type == "Line Chart":
-            st.line_chart(filtered_data[filter_column])
+            selection_chart("line", filtered_rows, filter_column, point_budget)
         elif chart_type == "Bar Chart":
-            st.bar_chart(filtered_data[filter_column])
+            selection_chart("bar", filtered_rows, filter_column, point_budget)
         elif chart_type == "Scatter Plot":
-            fig, ax = plt.subplots()
-            ax.scatter(filtered_data.index, filtered_data[filter_column], color=selected_color)
-            st.pyplot(fig)
+            chart_image("scatter", dataset, filter_column, filter_value, selected_color, lambda ax: density_scatter(ax, filtered_rows.index, filtered_rows.column(filter_column), selected_color))
         elif chart_type == "Histogram":
-            fig, ax = plt.subplots()
-            ax.hist(filtered_data[filter_column], bins=20, color=selected_color)
-            st.pyplot(fig)
+            chart_image("histogram", dataset, filter_column, filter_value, selected_color, lambda ax: threshold_histogram(ax, dataset, filter_column, filter_value, selected_color))
         elif chart_type == "Pie Chart":
-            fig, ax = plt.subplots()
-            ax.pie(filtered_data[filter_column].value_counts(), labels=data[filter_column].unique(), autopct='%1.1f%%', colors=[selected_color])
-            st.pyplot(fig)
+            chart_image("pie", dataset, filter_column, filter_value, selected_color, lambda ax: top_k_pie(ax, dataset, filter_column, filter_value, selected_color))
 
         # Data Download
-        csv = filtered_data.to_csv(index=False)
-        st.download_button("Download Filtered Data", data=csv, file_name="filtered_data.csv", mime="text/csv")
+        export_download(filtered_rows, "download", "Download Filtered Data")
 
     else:
         st.warning("Please enter a valid column name for filtering.")
@@ -101,24 +102,29 @@ if uploaded_file:
         chat_message = st.chat_input("Send a message to the team")
         if chat_message:
             st.write(f"You: {chat_message}")
-        with st.expander("Chat History"):
-            st.chat_message("user1").write("User 1: This data looks promising!")
-            st.chat_message("user2").write("User 2: Let's explore more filters.")
+        with deferred_expander("Chat History") as is_open:
+            if is_open:
+                st.chat_message("user1").write("User 1: This data looks promising!")
+                st.chat_message("user2").write("User 2: Let's explore more filters.")
 
-# Advanced Data Processing Simulation
+# Advanced Data Processing: index the dataset in the background
 st.header("Advanced Data Processing")
-with st.spinner("Processing large datasets..."):
-    for i in range(100):
-        time.sleep(0.02)
-    st.success("Processing completed!")
+if uploaded_file:
+    # Index only what this page's filter column and chart read
+    chart = {"Histogram": "histogram", "Pie Chart": "pie"}.get(chart_type)
+    processing_job = job_manager.submit(("prepare", dataset.key, filter_column, chart), "Dataset indexing", prepare_dataset, dataset, filter_column, chart)
+    job_progress(processing_job)
+else:
+    st.info("Upload a dataset to start processing.")
 
 # Metrics Display
 st.subheader("Key Metrics")
 if uploaded_file:
     if filter_column:
-        st.metric("Max Value", filtered_data[filter_column].max())
-        st.metric("Min Value", filtered_data[filter_column].min())
-        st.metric("Mean Value", round(filtered_data[filter_column].mean(), 2))
+        metrics = threshold_metrics(dataset, filter_column, filter_value)
+        st.metric("Max Value", metrics.max)
+        st.metric("Min Value", metrics.min)
+        st.metric("Mean Value", round(metrics.mean, 2))
 
 # Feedback Form
 st.subheader("Feedback Form")
@@ -130,12 +136,10 @@ with st.form("feedback_form"):
         st.write(f"Thank you, {user_name}, for your feedback!")
         st.write(f"Feedback Message: {feedback_message}")
 
-# Progress Bar for Data Export
+# Progress Bar for Data Export (runs in the background)
 st.subheader("Data Export Progress")
-progress = st.progress(0)
-for i in range(100):
-    time.sleep(0.05)
-    progress.progress(i + 1)
+if uploaded_file and filter_column in dataset.columns:
+    export_download(select_greater(dataset, filter_column, filter_value), "export", "Download Export")
 
 # Simulated LaTeX Formula for Mathematical Analysis
 st.latex(r"\int_a^b f(x)dx = F(b) - F(a)")
@@ -2,12 +2,16 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 
+from datahub import load_dataset, select_greater, threshold_metrics, upload_types
+from datahub.ui import chart_point_budget, deferred_expander, paged_table, selection_chart, summary_statistics
+
 # Title
 st.title("Dynamic Data Exploration")
 
 # Sidebar configuration
 st.sidebar.header("Settings")
-uploaded_file = st.sidebar.file_uploader("Upload CSV", type=["csv"])
+uploaded_file = st.sidebar.file_uploader("Upload CSV", type=upload_types())
+point_budget = chart_point_budget()
 
 # Radio button for chart type
 chart_type = st.sidebar.radio("Chart Type", ['Line', 'Bar', 'Scatter'])
@@ -21,32 +25,34 @@ filter_value = st.sidebar.slider("Filter data by value", 0, 100, 50)
 
 if uploaded_file is not None:
     # Read uploaded CSV
-    data = pd.read_csv(uploaded_file)
+    dataset = load_dataset(uploaded_file)
 
     # Display data and filtered data
     st.subheader("Uploaded Data")
-    st.dataframe(data)
+    paged_table(dataset, "data_table")
 
     st.subheader(f"Filtered {selected_column} Data")
-    filtered_data = data[data[selected_column] > filter_value]
-    st.table(filtered_data)
+    filtered_rows = select_greater(dataset, selected_column, filter_value)
+    paged_table(filtered_rows, "filtered_table", static=True)
 
     # Display Chart based on user choice
     st.subheader("Data Visualization")
     if chart_type == 'Line':
-        st.line_chart(filtered_data[selected_column])
+        selection_chart("line", filtered_rows, selected_column, point_budget)
     elif chart_type == 'Bar':
-        st.bar_chart(filtered_data[selected_column])
+        selection_chart("bar", filtered_rows, selected_column, point_budget)
     else:
-        st.scatter_chart(filtered_data[selected_column])
+        selection_chart("scatter", filtered_rows, selected_column, point_budget)
 
     # Expander for summary statistics
-    with st.expander("Show Summary Statistics"):
-        st.write(filtered_data.describe())
+    with deferred_expander("Show Summary Statistics") as is_open:
+        if is_open:
+            summary_statistics(dataset, selected_column, filter_value)
 
     # Metrics and progress
-    st.metric("Max Value", filtered_data[selected_column].max())
-    st.progress(int(filtered_data[selected_column].max()))
+    metrics = threshold_metrics(dataset, selected_column, filter_value)
+    st.metric("Max Value", metrics.max)
+    st.progress(int(metrics.max))
 
     # Display a LaTeX formula
     st.latex(r"a^2 + b^2 = c^2")
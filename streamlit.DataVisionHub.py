@@ -2,6 +2,9 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 
+from datahub import load_dataset, upload_types
+from datahub.ui import chart_point_budget, dataset_summary, paged_table, selection_chart
+
 # App Title
 st.title("Interactive Data Insights")
 
@@ -10,22 +13,23 @@ st.header("Data Upload and Overview")
 st.subheader("Upload your CSV dataset")
 
 # File uploader
-uploaded_file = st.file_uploader("Upload a CSV file", type=["csv"])
+uploaded_file = st.file_uploader("Upload a CSV file", type=upload_types())
+point_budget = chart_point_budget()
 
 if uploaded_file is not None:
     # Read and display data
-    data = pd.read_csv(uploaded_file)
-    st.dataframe(data)
+    dataset = load_dataset(uploaded_file)
+    paged_table(dataset, "data_table")
 
     # Column selection using selectbox
-    selected_column = st.selectbox("Select column to visualize", data.columns)
+    selected_column = st.selectbox("Select column to visualize", list(dataset.columns))
 
     # Line chart for selected column
-    st.line_chart(data[selected_column])
+    selection_chart("line", dataset, selected_column, point_budget)
 
     # Show summary statistics
     st.subheader("Data Summary")
-    st.table(data.describe())
+    dataset_summary(dataset, static=True)
 
     # Divider
     st.divider()
@@ -35,7 +39,7 @@ if uploaded_file is not None:
         selected_color = st.color_picker("Pick a color for chart")
 
         st.markdown(f"### You selected: `{selected_color}`")
-        st.area_chart(data[selected_column])
+        selection_chart("area", dataset, selected_column, point_budget)
 
     # Display success and info messages
     st.success("Data successfully uploaded and visualized!")
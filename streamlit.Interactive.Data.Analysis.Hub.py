@@ -2,8 +2,13 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import time
+
+from datahub import select_greater, upload_types
+from datahub.density import density_scatter
+from datahub.jobs import job_manager
+from datahub.tasks import prepare_dataset
+from datahub.topk import top_k_pie
+from datahub.ui import chart_image, chart_point_budget, deferred_expander, export_download, fast_preview, ingest_summary, job_progress, load_with_preview, paged_table, pyramid_chart, summary_statistics, threshold_metric_cards, zoom_window
 
 # Title and header for the app
 st.title("DataViz Pro: Interactive Data Analysis Hub")
@@ -11,7 +16,8 @@ st.header("Explore, Visualize, and Collaborate on Data")
 
 # Sidebar for file upload and configuration
 st.sidebar.header("Upload Your Dataset")
-uploaded_file = st.sidebar.file_uploader("Upload CSV", type=["csv"])
+uploaded_file = st.sidebar.file_uploader("Upload CSV", type=upload_types())
+point_budget = chart_point_budget()
 
 # Sidebar for chart type and settings
 st.sidebar.subheader("Visualization Settings")
@@ -30,58 +36,51 @@ with st.sidebar.expander("Submit Your Feedback"):
 
 # Load data if file is uploaded
 if uploaded_file:
-    data = pd.read_csv(uploaded_file)
     st.write("### Raw Data Preview")
-    st.dataframe(data.head(10))
+    dataset = load_with_preview(uploaded_file, preview_rows=10)
+    # The whole dataset, or a sample of it in fast preview mode
+    view = fast_preview(dataset)
 
     # Filter data based on user input
-    filter_column = st.selectbox("Select Column to Filter", data.columns)
-    filtered_data = data[data[filter_column] > filter_value]
+    filter_column = st.selectbox("Select Column to Filter", dataset.columns)
+    filtered_rows = select_greater(view, filter_column, filter_value)
     st.write(f"Filtered Data (where `{filter_column}` > {filter_value})")
-    st.dataframe(filtered_data)
+    paged_table(filtered_rows, "filtered_table")
 
     # Visualization of filtered data
     st.subheader(f"{chart_type} for {filter_column}")
+    zoom = zoom_window(view)
     if chart_type == "Line Chart":
-        st.line_chart(filtered_data[filter_column], height=400, use_container_width=True)
+        pyramid_chart("line", view, filter_column, filter_value, point_budget, zoom, height=400, use_container_width=True)
     elif chart_type == "Bar Chart":
-        st.bar_chart(filtered_data[filter_column], height=400, use_container_width=True)
+        pyramid_chart("bar", view, filter_column, filter_value, point_budget, zoom, height=400, use_container_width=True)
     elif chart_type == "Scatter Plot":
-        fig, ax = plt.subplots()
-        ax.scatter(filtered_data.index, filtered_data[filter_column], color=color_picker)
-        st.pyplot(fig)
+        chart_image("scatter", view, filter_column, filter_value, color_picker, lambda ax: density_scatter(ax, filtered_rows.index, filtered_rows.column(filter_column), color_picker))
     elif chart_type == "Area Chart":
-        st.area_chart(filtered_data[filter_column], height=400, use_container_width=True)
+        pyramid_chart("area", view, filter_column, filter_value, point_budget, zoom, height=400, use_container_width=True)
     elif chart_type == "Pie Chart":
-        pie_data = filtered_data[filter_column].value_counts()
-        fig, ax = plt.subplots()
-        ax.pie(pie_data, labels=pie_data.index, autopct='%1.1f%%', colors=[color_picker])
-        st.pyplot(fig)
+        chart_image("pie", view, filter_column, filter_value, color_picker, lambda ax: top_k_pie(ax, view, filter_column, filter_value, color_picker))
 
     # Expander for data summary statistics
-    with st.expander("Summary Statistics"):
-        st.write(filtered_data.describe())
+    with deferred_expander("Summary Statistics") as is_open:
+        if is_open:
+            summary_statistics(view, filter_column, filter_value)
 
     # Option to download filtered data
     st.subheader("Download Filtered Data")
-    csv = filtered_data.to_csv(index=False)
-    st.download_button("Download CSV", data=csv, file_name="filtered_data.csv", mime="text/csv")
+    # Always every matching row, also in fast preview mode
+    export_download(select_greater(dataset, filter_column, filter_value), "download", "Download")
 
-# Simulating data processing with progress bar
+# Parse progress of the uploaded dataset
 st.header("Data Processing Progress")
-with st.spinner("Processing your data..."):
-    progress_bar = st.progress(0)
-    for i in range(100):
-        time.sleep(0.05)
-        progress_bar.progress(i + 1)
-st.success("Data processing completed!")
+if uploaded_file:
+    ingest_summary(dataset)
+    st.success("Data processing completed!")
 
 # Metrics visualization
 st.header("Key Metrics")
 if uploaded_file:
-    st.metric("Maximum Value", filtered_data[filter_column].max())
-    st.metric("Minimum Value", filtered_data[filter_column].min())
-    st.metric("Mean Value", round(filtered_data[filter_column].mean(), 2))
+    threshold_metric_cards(view, filter_column, filter_value)
 
 # Collaboration Mode Section
 if collaboration_mode:
@@ -89,18 +88,22 @@ if collaboration_mode:
     chat_message = st.chat_input("Send a message to the team")
     if chat_message:
         st.write(f"You: {chat_message}")
-    with st.expander("Chat History"):
-        st.chat_message("Analyst1").write("Analyst1: Let's review the outliers.")
-        st.chat_message("Analyst2").write("Analyst2: I agree! The patterns are interesting.")
+    with deferred_expander("Chat History") as is_open:
+        if is_open:
+            st.chat_message("Analyst1").write("Analyst1: Let's review the outliers.")
+            st.chat_message("Analyst2").write("Analyst2: I agree! The patterns are interesting.")
 
 # Latex Formula Display Example
 st.latex(r"\int_a^b f(x)dx = F(b) - F(a)")
 
-# Long-running task simulation with spinner
+# Long-running analysis in the background
 st.header("Running Advanced Analysis")
-with st.spinner("Performing complex computations..."):
-    time.sleep(3)
-st.success("Advanced analysis completed!")
+if uploaded_file:
+    # Index only what this page's filter column and chart read
+    chart = {"Line Chart": "pyramid", "Bar Chart": "pyramid", "Area Chart": "pyramid", "Pie Chart": "pie"}.get(chart_type)
+    job_progress(job_manager.submit(("prepare", view.key, filter_column, chart), "Dataset indexing", prepare_dataset, view, filter_column, chart))
+else:
+    st.info("Upload a dataset to run the advanced analysis.")
 
 # Footer Section
 st.markdown("---")
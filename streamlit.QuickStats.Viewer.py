@@ -3,12 +3,16 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 
+from datahub import load_lazy_dataset, select_greater, threshold_metrics, upload_types
+from datahub.ui import chart_point_budget, deferred_expander, paged_table, selection_chart, summary_statistics
+
 # App title
 st.title("Interactive Data Analysis Tool")
 
 # Sidebar for file upload and settings
 st.sidebar.header("Input Settings")
-uploaded_file = st.sidebar.file_uploader("Upload your CSV", type=["csv"])
+uploaded_file = st.sidebar.file_uploader("Upload your CSV", type=upload_types())
+point_budget = chart_point_budget()
 
 # Sidebar radio for chart type selection
 chart_type = st.sidebar.radio("Choose chart type", ["Line", "Bar", "Scatter"])
@@ -23,30 +27,33 @@ chart_color = st.sidebar.color_picker("Pick a chart color", "#FF6347")
 st.header("Data Display and Visualization")
 
 if uploaded_file:
-    data = pd.read_csv(uploaded_file)
-    st.dataframe(data)
+    # Only the header is read here; columns are parsed as they are selected
+    dataset = load_lazy_dataset(uploaded_file)
+    paged_table(dataset, "data_table")
 
-    selected_column = st.selectbox("Select a column for visualization", data.columns)
-    filtered_data = data[data[selected_column] > filter_value]
+    selected_column = st.selectbox("Select a column for visualization", dataset.columns)
+    filtered_rows = select_greater(dataset, selected_column, filter_value)
 
     st.subheader(f"Filtered Data for {selected_column} > {filter_value}")
-    st.write(filtered_data)
+    paged_table(filtered_rows, "filtered_table")
 
     # Displaying selected chart type
     if chart_type == "Line":
-        st.line_chart(filtered_data[selected_column])
+        selection_chart("line", filtered_rows, selected_column, point_budget)
     elif chart_type == "Bar":
-        st.bar_chart(filtered_data[selected_column])
+        selection_chart("bar", filtered_rows, selected_column, point_budget)
     else:
-        st.scatter_chart(filtered_data[selected_column])
+        selection_chart("scatter", filtered_rows, selected_column, point_budget)
 
     # Expander for summary statistics
-    with st.expander("Show summary statistics"):
-        st.write(filtered_data.describe())
+    with deferred_expander("Show summary statistics") as is_open:
+        if is_open:
+            summary_statistics(dataset, selected_column, filter_value)
 
     # Progress bar and metric display
-    st.progress(int(filtered_data[selected_column].mean()))
-    st.metric(label="Max Value", value=f"{filtered_data[selected_column].max()}")
+    metrics = threshold_metrics(dataset, selected_column, filter_value)
+    st.progress(int(metrics.mean))
+    st.metric(label="Max Value", value=f"{metrics.max}")
 
     # Button and success message
     if st.button("Run Analysis"):
@@ -2,7 +2,9 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import time
+
+from datahub import select_greater, upload_types
+from datahub.ui import chart_point_budget, deferred_expander, fast_preview, ingest_summary, load_with_preview, paged_table, pyramid_chart, selection_chart, summary_statistics, threshold_metric_cards, zoom_window
 
 # App Title
 st.title("Advanced Data Analysis and Visualization Dashboard")
@@ -11,7 +13,8 @@ st.title("Advanced Data Analysis and Visualization Dashboard")
 st.sidebar.header("Upload and Customize")
 
 # File uploader in sidebar
-uploaded_file = st.sidebar.file_uploader("Upload a CSV file", type=["csv"])
+uploaded_file = st.sidebar.file_uploader("Upload a CSV file", type=upload_types())
+point_budget = chart_point_budget()
 
 # Sidebar settings for visualization
 chart_type = st.sidebar.radio("Select Chart Type", ["Line Chart", "Bar Chart", "Area Chart", "Scatter Chart"])
@@ -28,49 +31,47 @@ st.markdown("This dashboard allows users to upload datasets, filter the data, an
 
 # If file is uploaded
 if uploaded_file:
-    data = pd.read_csv(uploaded_file)
-
-    # Displaying the first few rows of the dataset
+    # Displaying the first few rows of the dataset; columns are parsed as
+    # they are selected
     st.subheader("Preview of Uploaded Data")
-    st.dataframe(data.head())
+    dataset = load_with_preview(uploaded_file, preview_rows=5, lazy=True)
+    # The whole dataset, or a sample of it in fast preview mode
+    view = fast_preview(dataset)
 
     # Select column for filtering and visualization
-    selected_column = st.selectbox("Select a column to visualize", data.columns)
+    selected_column = st.selectbox("Select a column to visualize", dataset.columns)
 
     # Filter data based on user selection
-    filtered_data = data[data[selected_column] > value_filter]
+    filtered_rows = select_greater(view, selected_column, value_filter)
     st.write(f"Filtered Data for `{selected_column}` > {value_filter}")
-    st.dataframe(filtered_data)
+    paged_table(filtered_rows, "filtered_table")
 
     # Display selected chart type
     st.subheader(f"{chart_type} of `{selected_column}`")
+    zoom = zoom_window(view)
     if chart_type == "Line Chart":
-        st.line_chart(filtered_data[selected_column])
+        pyramid_chart("line", view, selected_column, value_filter, point_budget, zoom)
     elif chart_type == "Bar Chart":
-        st.bar_chart(filtered_data[selected_column])
+        pyramid_chart("bar", view, selected_column, value_filter, point_budget, zoom)
     elif chart_type == "Area Chart":
-        st.area_chart(filtered_data[selected_column])
+        pyramid_chart("area", view, selected_column, value_filter, point_budget, zoom)
     else:
-        st.scatter_chart(filtered_data[selected_column])
+        selection_chart("scatter", filtered_rows, selected_column, point_budget)
 
     # Show data metrics if checkbox is selected
     if show_metrics:
         st.subheader("Data Metrics")
-        st.metric("Maximum Value", filtered_data[selected_column].max())
-        st.metric("Minimum Value", filtered_data[selected_column].min())
-        st.metric("Mean Value", round(filtered_data[selected_column].mean(), 2))
+        threshold_metric_cards(view, selected_column, value_filter)
 
     # Display summary statistics in an expander
-    with st.expander("Show Summary Statistics"):
-        st.write(filtered_data.describe())
+    with deferred_expander("Show Summary Statistics") as is_open:
+        if is_open:
+            summary_statistics(view, selected_column, value_filter)
 
     # Display progress bar if selected
     if progress_display:
         st.subheader("Data Processing Progress")
-        progress_bar = st.progress(0)
-        for percent_complete in range(100):
-            time.sleep(0.05)
-            progress_bar.progress(percent_complete + 1)
+        ingest_summary(dataset)
 
     # Add LaTeX formula for fun
     st.latex(r"\int_a^b f(x)dx = F(b) - F(a)")
@@ -3,12 +3,16 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 
+from datahub import load_lazy_dataset, select_greater, threshold_metrics, upload_types
+from datahub.ui import chart_point_budget, deferred_expander, paged_table, selection_chart, summary_statistics
+
 # Title
 st.title("Dynamic Data Visualization Dashboard")
 
 # Sidebar for file upload and settings
 st.sidebar.header("Configuration Panel")
-uploaded_file = st.sidebar.file_uploader("Upload CSV file", type="csv")
+uploaded_file = st.sidebar.file_uploader("Upload CSV file", type=upload_types())
+point_budget = chart_point_budget()
 
 # Sidebar widgets for chart and filters
 chart_type = st.sidebar.radio("Select Chart Type", ["Bar", "Line", "Area"])
@@ -22,33 +26,36 @@ st.header("Dataset and Charts")
 
 # If file is uploaded, display data
 if uploaded_file:
-    data = pd.read_csv(uploaded_file)
+    # Only the header is read here; columns are parsed as they are selected
+    dataset = load_lazy_dataset(uploaded_file)
     st.write("Data Overview")
-    st.dataframe(data)
+    paged_table(dataset, "data_table")
 
     # Column selection
-    selected_column = st.selectbox("Select a column to visualize", data.columns)
+    selected_column = st.selectbox("Select a column to visualize", dataset.columns)
 
     # Apply minimum value filter
-    filtered_data = data[data[selected_column] > min_value]
+    filtered_rows = select_greater(dataset, selected_column, min_value)
     st.subheader(f"Filtered {selected_column} Data (>{min_value})")
-    st.write(filtered_data)
+    paged_table(filtered_rows, "filtered_table")
 
     # Display chart based on user selection
     if chart_type == "Bar":
-        st.bar_chart(filtered_data[selected_column])
+        selection_chart("bar", filtered_rows, selected_column, point_budget)
     elif chart_type == "Line":
-        st.line_chart(filtered_data[selected_column])
+        selection_chart("line", filtered_rows, selected_column, point_budget)
     else:
-        st.area_chart(filtered_data[selected_column])
+        selection_chart("area", filtered_rows, selected_column, point_budget)
 
     # Expander for detailed statistics
-    with st.expander("Show Statistics"):
-        st.write(filtered_data.describe())
+    with deferred_expander("Show Statistics") as is_open:
+        if is_open:
+            summary_statistics(dataset, selected_column, min_value)
 
     # Progress bar and metrics
-    st.progress(int(filtered_data[selected_column].mean()))
-    st.metric(label="Max Value", value=f"{filtered_data[selected_column].max()}")
+    metrics = threshold_metrics(dataset, selected_column, min_value)
+    st.progress(int(metrics.mean))
+    st.metric(label="Max Value", value=f"{metrics.max}")
 
     # LaTeX formula
     st.latex(r"a^2 + b^2 = c^2")
@@ -2,8 +2,14 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import time
+
+from datahub import RowView, select_greater, upload_types
+from datahub.density import density_scatter
+from datahub.histogram import threshold_histogram
+from datahub.jobs import job_manager
+from datahub.tasks import prepare_dataset
+from datahub.topk import top_k_pie
+from datahub.ui import cache_panel, chart_image, chart_point_budget, deferred_expander, export_download, ingest_summary, job_progress, load_with_preview, overview_chart, paged_table, selection_chart, summary_statistics
 
 # User Authentication Simulation
 def authenticate_user(username, password):
@@ -35,7 +41,9 @@ if not st.session_state.authenticated:
 
 # Sidebar Configuration
 st.sidebar.header("User Settings")
-uploaded_file = st.sidebar.file_uploader("Upload a CSV file", type=["csv"])
+uploaded_file = st.sidebar.file_uploader("Upload a CSV file", type=upload_types())
+point_budget = chart_point_budget()
+cache_panel()
 chart_type = st.sidebar.radio("Select Chart Type", ["Line Chart", "Bar Chart", "Scatter Plot", "Histogram", "Pie Chart"])
 filter_column = st.sidebar.text_input("Filter column (by name)")
 filter_value = st.sidebar.slider("Filter values greater than", 0, 100, 50)
@@ -46,29 +54,29 @@ collaboration_mode = st.sidebar.checkbox("Enable Collaboration Mode")
 if collaboration_mode:
     st.sidebar.info("Collaboration Mode: Live updates and real-time chat enabled.")
 
-# Session-based Persistent Data Settings
-if 'filtered_data' not in st.session_state:
-    st.session_state.filtered_data = pd.DataFrame()
+# Session-based Persistent Data Settings (row positions over the shared dataset, not a copy)
+if 'filtered_rows' not in st.session_state:
+    st.session_state.filtered_rows = RowView.empty_view()
 
 # Main App Section
 st.header("Data Overview & Visualization")
 
 if uploaded_file:
-    # Read the uploaded file
-    data = pd.read_csv(uploaded_file)
+    # Read the uploaded file, previewing the first chunk while the rest parses
     st.write("### Raw Data")
-    st.dataframe(data.head(10))
+    dataset = load_with_preview(uploaded_file, preview_rows=10)
 
     # Column selection and filtering
-    if filter_column and filter_column in data.columns:
-        filtered_data = data[data[filter_column] > filter_value]
-        st.session_state.filtered_data = filtered_data
+    if filter_column and filter_column in dataset.columns:
+        filtered_rows = select_greater(dataset, filter_column, filter_value)
+        st.session_state.filtered_rows = filtered_rows
         st.write(f"### Filtered Data (by `{filter_column} > {filter_value}`)")
-        st.dataframe(filtered_data)
+        paged_table(filtered_rows, "filtered_table")
 
         # Show summary statistics in expander
-        with st.expander("Show Summary Statistics"):
-            st.write(filtered_data.describe())
+        with deferred_expander("Show Summary Statistics") as is_open:
+            if is_open:
+                summary_statistics(dataset, filter_column, filter_value)
 
     else:
         st.warning(f"Column `{filter_column}` not found in the dataset!")
@@ -77,32 +85,28 @@ if uploaded_file:
     st.subheader(f"{chart_type} of `{filter_column}`")
 
     # Plot based on chart type
-    if chart_type == "Line Chart":
-        st.line_chart(st.session_state.filtered_data[filter_column] if filter_column else data)
+    if filter_column not in dataset.columns and chart_type in ("Line Chart", "Bar Chart"):
+        # No column to filter on: every numeric column, reduced
+        overview_chart("line" if chart_type == "Line Chart" else "bar", dataset, point_budget)
+    elif filter_column not in dataset.columns:
+        st.info("Choose a column of the dataset to chart.")
+    elif chart_type == "Line Chart":
+        selection_chart("line", st.session_state.filtered_rows, filter_column, point_budget)
     elif chart_type == "Bar Chart":
-        st.bar_chart(st.session_state.filtered_data[filter_column] if filter_column else data)
+        selection_chart("bar", st.session_state.filtered_rows, filter_column, point_budget)
     elif chart_type == "Scatter Plot":
-        fig, ax = plt.subplots()
-        ax.scatter(st.session_state.filtered_data.index, st.session_state.filtered_data[filter_column] if filter_column else data[filter_column], color=color)
-        st.pyplot(fig)
+        chart_image("scatter", dataset, filter_column, filter_value, color, lambda ax: density_scatter(ax, st.session_state.filtered_rows.index, st.session_state.filtered_rows.column(filter_column), color))
     elif chart_type == "Histogram":
-        fig, ax = plt.subplots()
-        ax.hist(st.session_state.filtered_data[filter_column] if filter_column else data[filter_column], bins=20, color=color)
-        st.pyplot(fig)
+        chart_image("histogram", dataset, filter_column, filter_value, color, lambda ax: threshold_histogram(ax, dataset, filter_column, filter_value, color))
     elif chart_type == "Pie Chart":
-        fig, ax = plt.subplots()
-        ax.pie(st.session_state.filtered_data[filter_column].value_counts() if filter_column else data[filter_column].value_counts(), labels=data[filter_column].unique(), autopct="%1.1f%%", colors=[color])
-        st.pyplot(fig)
+        chart_image("pie", dataset, filter_column, filter_value, color, lambda ax: top_k_pie(ax, dataset, filter_column, filter_value, color))
 
     # LaTeX Formula Example
     st.latex(r"\sum_{i=1}^{n} x_i = X")
 
-    # Add a progress bar for simulation of processing
+    # Parse progress of the uploaded file
     st.subheader("Data Processing Progress")
-    progress_bar = st.progress(0)
-    for i in range(100):
-        time.sleep(0.02)
-        progress_bar.progress(i + 1)
+    ingest_summary(dataset)
 
     # Collaborative mode with user feedback
     if collaboration_mode:
@@ -114,19 +118,19 @@ if uploaded_file:
             st.balloons()
 
         st.chat_input("Send a message to the team")
-        with st.expander("Chat Messages"):
-            # Simulate chat history
-            st.chat_message("user1").write("User 1: Great insights!")
-            st.chat_message("user2").write("User 2: Let’s dive deeper into the analysis.")
+        with deferred_expander("Chat Messages") as is_open:
+            if is_open:
+                # Simulate chat history
+                st.chat_message("user1").write("User 1: Great insights!")
+                st.chat_message("user2").write("User 2: Let’s dive deeper into the analysis.")
 
 else:
     st.info("Please upload a CSV file to start.")
 
 # Data Download
-if not st.session_state.filtered_data.empty:
+if not st.session_state.filtered_rows.empty:
     st.subheader("Download Filtered Data")
-    csv = st.session_state.filtered_data.to_csv(index=False)
-    st.download_button(label="Download CSV", data=csv, file_name="filtered_data.csv", mime="text/csv")
+    export_download(st.session_state.filtered_rows, "download", "Download")
 
 # Form for Feedback Submission
 st.subheader("Feedback Form")
@@ -139,11 +143,14 @@ with st.form("feedback_form"):
         st.write("Your feedback message:")
         st.write(feedback_message)
 
-# Spinner Simulation for Long Tasks
-st.subheader("Simulation of Long Running Task")
-with st.spinner("Simulating long task..."):
-    time.sleep(3)
-st.success("Task completed!")
+# Long Running Task: indexing the dataset in the background
+st.subheader("Long Running Task")
+if uploaded_file:
+    # Index only what this page's filter column and chart read
+    chart = {"Histogram": "histogram", "Pie Chart": "pie"}.get(chart_type)
+    job_progress(job_manager.submit(("prepare", dataset.key, filter_column, chart), "Dataset indexing", prepare_dataset, dataset, filter_column, chart))
+else:
+    st.info("Upload a dataset to run the indexing task.")
 
 # Footer Section
 st.markdown("---")
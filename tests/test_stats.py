@@ -0,0 +1,27 @@
+import numpy as np
+import pandas as pd
+
+from datahub import Dataset, RunningStats
+from datahub.metrics import threshold_metrics
+from datahub.summary import describe_greater
+
+
+def test_variance_survives_a_large_offset():
+    # Timestamps: a spread of 1 on top of 1.7e9, where sums of squares
+    # cancel to nothing
+    values = 1.7e9 + np.random.default_rng(0).normal(size=200_000)
+    dataset = Dataset("offset", pd.DataFrame({"ts": values}))
+    selected = pd.Series(values[values > 1.7e9 + 0.5])
+    metrics = threshold_metrics(dataset, "ts", 1.7e9 + 0.5)
+    assert metrics.count == len(selected)
+    assert np.isclose(metrics.std, selected.std(), rtol=1e-5)
+    assert np.isclose(describe_greater(dataset, "ts", 0).loc["std", "ts"], np.std(values, ddof=1), rtol=1e-5)
+
+
+def test_merged_blocks_match_the_whole():
+    values = 1e12 + np.random.default_rng(1).normal(size=10_000)
+    merged = RunningStats()
+    for block in np.array_split(values, 7):
+        merged = merged.merge(RunningStats.of(block))
+    assert merged.count == len(values)
+    assert np.isclose(merged.std, np.std(values, ddof=1), rtol=1e-4)